@@ -0,0 +1,134 @@
+#!/usr/bin/python3
+
+import sys
+import json
+import time
+import runpy
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from pathlib import Path
+import logging
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger('benchmark')
+
+repo_path = Path(__file__).resolve().parents[1]
+sys.path.append(str(repo_path / 'bench'))
+
+import fleet
+
+BASELINES = repo_path / 'bench' / 'baselines.json'
+# Fleet sizes as (datacenters, switches per datacenter)
+SIZES = {
+    'small': (1, 8),
+    'medium': (4, 25),
+    'large': (10, 50),
+}
+# Differences below this many seconds are never reported as regressions
+NOISE_FLOOR = 0.05
+
+
+def get_options():
+    parser = argparse.ArgumentParser(prog='benchmark', description='Times every build step and the whole build on synthetic fleets and compares them with stored baselines')
+    parser.add_argument('-s', '--size', dest='sizes', action='append', choices=list(SIZES), help='fleet size to run, can be repeated (default: small and medium)')
+    parser.add_argument('-r', '--repeat', dest='repeat', type=int, default=3, help='number of runs, the fastest one is reported')
+    parser.add_argument('-j', '--jobs', dest='jobs', type=int, default=1, help='worker processes of the end-to-end build')
+    parser.add_argument('-t', '--threshold', dest='threshold', type=float, default=0.2, help='relative slowdown reported as regression')
+    parser.add_argument('--save', dest='save', action='store_true', help='store results as the new baselines')
+    return parser.parse_args()
+
+
+def machine():
+    return '%s %s, Python %s' % (platform.machine(), platform.processor() or platform.system(), platform.python_version())
+
+
+def time_steps(fleet_path, steps, repeat):
+    """
+    Runs build steps in this process and returns the fastest time of every step.
+    Resources, the build cache and the parsed YAML documents (in memory and on disk)
+    are reset before every run.
+    """
+    from builder import resources, documents
+    from builder.cache import BuildCache, CACHE_DIR
+    timings = {}
+    for _ in range(repeat):
+        resources.reset()
+        documents.get.cache_clear()
+        shutil.rmtree(fleet_path / CACHE_DIR / 'yaml', ignore_errors=True)
+        state = {'cache': BuildCache(fleet_path, force=True), 'jobs': 1, 'selected': None}
+        for step in steps:
+            start = time.perf_counter()
+            step['method'](fleet_path, state)
+            elapsed = time.perf_counter() - start
+            timings[step['name']] = round(min(timings.get(step['name'], elapsed), elapsed), 4)
+    shutil.rmtree(fleet_path / '_build', ignore_errors=True)
+    return timings
+
+
+def time_build(fleet_path, repeat, jobs):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, str(fleet_path / 'build'), '-f', '-j', str(jobs)], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best, 4)
+
+
+def run_size(name, steps, options):
+    datacenters, switches = SIZES[name]
+    with tempfile.TemporaryDirectory(prefix='bench-') as tmp:
+        fleet_path = Path(tmp)
+        fleet.generate(fleet_path, datacenters, switches)
+        shutil.copyfile(repo_path / 'build', fleet_path / 'build')
+        shutil.copytree(repo_path / 'builder', fleet_path / 'builder', ignore=shutil.ignore_patterns('__pycache__'))
+        result = {'switches': datacenters * switches, 'steps': time_steps(fleet_path, steps, options.repeat)}
+        result['end_to_end'] = time_build(fleet_path, options.repeat, options.jobs)
+    return result
+
+
+def compare(name, result, baseline, threshold):
+    """
+    Prints results next to the baseline and returns list of regressed metrics.
+    """
+    metrics = [('step: ' + step, val, baseline.get('steps', {}).get(step)) for step, val in result['steps'].items()]
+    metrics.append(('end to end', result['end_to_end'], baseline.get('end_to_end')))
+    regressions = []
+    print('== %s (%s switches)' % (name, result['switches']))
+    for metric, val, base in metrics:
+        if base is None:
+            print('  %-45s %8.3fs' % (metric, val))
+            continue
+        change = (val - base) / base if base > 0 else 0.0
+        regressed = change > threshold and val - base > NOISE_FLOOR
+        print('  %-45s %8.3fs  baseline %8.3fs  %+6.1f%%%s' % (metric, val, base, change * 100, '  REGRESSION' if regressed else ''))
+        if regressed:
+            regressions.append('%s %s' % (name, metric))
+    return regressions
+
+
+if __name__ == "__main__":
+    options = get_options()
+    # Load the step list from the build script without running it
+    build = runpy.run_path(str(repo_path / 'build'), run_name='benchmark')
+    logging.getLogger('builder').setLevel(logging.WARNING)
+    baselines = json.loads(BASELINES.read_text()) if BASELINES.exists() else {}
+    if baselines and baselines.get('machine') != machine():
+        print('Baselines were recorded on %s, comparison may not be meaningful' % baselines.get('machine'))
+
+    regressions = []
+    results = {}
+    for name in options.sizes or ['small', 'medium']:
+        results[name] = run_size(name, build['steps'], options)
+        regressions += compare(name, results[name], baselines.get('sizes', {}).get(name, {}), options.threshold)
+
+    if options.save:
+        baselines['machine'] = machine()
+        baselines.setdefault('sizes', {}).update(results)
+        BASELINES.write_text(json.dumps(baselines, indent=4, sort_keys=True) + '\n')
+        print('Baselines saved to %s' % BASELINES)
+    elif regressions:
+        print('Regressions: %s' % ', '.join(regressions))
+        sys.exit(1)
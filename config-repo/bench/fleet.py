@@ -0,0 +1,205 @@
+#!/usr/bin/python3
+
+import sys
+import json
+import yaml
+import random
+import shutil
+import argparse
+from pathlib import Path
+import logging
+logger = logging.getLogger('fleet')
+
+repo_path = Path(__file__).resolve().parents[1]
+
+# Synthetic platforms: name -> (hwsku, number of 4 lane ports)
+PLATFORMS = {
+    'x86_64-synthetic_32x100g-r0': ('Synthetic-32X100G', 32),
+    'x86_64-synthetic_64x100g-r0': ('Synthetic-64X100G', 64),
+}
+BREAKOUT_MODES = {'1x100G[40G]': 1, '2x50G': 2, '4x25G': 4, '4x10G': 4}
+VRFS = [10, 20, 30]
+
+
+def generate_platform(ports):
+    """
+    Returns platform.json content in the format exported from SONiC devices, every port has 4 lanes.
+    """
+    interfaces = {}
+    for index in range(ports):
+        lanes = range(4 * index + 1, 4 * index + 5)
+        interfaces['Ethernet%s' % (4 * index)] = {
+            'index': ','.join([str(index + 1)] * 4),
+            'lanes': ','.join(str(lane) for lane in lanes),
+            'breakout_modes': {
+                mode: ['Eth%s' % (index + 1)] if count == 1 else ['Eth%s/%s' % (index + 1, sub + 1) for sub in range(count)]
+                for mode, count in BREAKOUT_MODES.items()
+            }
+        }
+    return {'interfaces': interfaces}
+
+
+def generate_dc(dc_index):
+    return {
+        'vpn': '10.%s.255.1' % dc_index,
+        'switched_vlans': {10: {'vrfid': 10, 'tagged_port_groups': ['lesw_to_spsw_trunk-100G']}},
+        'routed_vlans': {11: {'vrfid': 10, 'port_groups': ['servers-25G', 'servers-100G']}},
+        'static_routes': [{'vrfid': 20, 'prefix': '0.0.0.0/0', 'nexthop': '10.%s.255.1' % dc_index}],
+        'bgp': {
+            'prod': {
+                'vrfid': 10,
+                'peer_groups': {
+                    'PG-SERVERS': {
+                        'remote_type': 'external',
+                        'unnumbered_bgp_port_groups': ['servers-25G'],
+                        'import_route_maps': [{'prefixes': ['permit 0.0.0.0/0'], 'action': 'permit'}, {'action': 'deny'}],
+                        'export_route_maps': [{'prefixes': ['permit 10.0.0.0/8 ge 32'], 'action': 'permit'}, {'action': 'deny'}],
+                    }
+                }
+            }
+        }
+    }
+
+
+def route_maps(rng, count):
+    maps = [{'action': 'permit', 'prefixes': ['permit 10.%s.0.0/16 le 32' % rng.randint(0, 255)]} for _ in range(count)]
+    if rng.random() < 0.5:
+        maps[0]['match'] = {'tag': rng.randint(1, 100)}
+        maps[0]['set'] = {'metric': rng.randint(1, 100)}
+    return maps + [{'action': 'deny'}]
+
+
+def generate_leaf(rng, dc_index, index, platform, spines):
+    ports = PLATFORMS[platform][1]
+    last = 4 * (ports - 1)
+    # Top part of the switch is broken out to 4x25G server ports
+    breakout_start = 4 * (ports - rng.randint(ports // 4, ports // 2))
+    vlans = {}
+    for vlan in range(20, 20 + rng.randint(2, 8)):
+        vlans[vlan] = {
+            'vrfid': rng.choice(VRFS),
+            'addresses': ['10.%s.%s.%s/24' % (dc_index, vlan, index + 1)],
+            'tagged_port_groups': ['servers-100G'],
+        }
+    vlans[20].update({'vrfid': 20, 'untagged_ports': '40'})
+    vlans[20]['tagged_port_groups'] = []
+    peer_groups = {}
+    for group in range(rng.randint(1, 4)):
+        peer_groups['PG-EXT-%s' % group] = {
+            'remote_type': 'external',
+            'neighbors': [{'address': '172.%s.%s.%s' % (dc_index, index, 4 * group + n), 'description': 'ext-%s-%s' % (group, n)} for n in range(rng.randint(1, 4))],
+            'import_route_maps': route_maps(rng, rng.randint(1, 5)),
+            'export_route_maps': route_maps(rng, rng.randint(1, 5)),
+        }
+    peer_groups['PG-SPINES'] = {
+        'remote_type': 'external',
+        'neighbors': [{'address': '10.%s.254.%s' % (dc_index, spine + 1), 'description': 'spine%02d' % (spine + 1)} for spine in range(spines)],
+        'import_route_maps': route_maps(rng, 1),
+        'export_route_maps': route_maps(rng, 1),
+    }
+    return {
+        'mac': '02:%02x:%02x:%02x:00:01' % (dc_index, index // 256, index % 256),
+        'platform': platform,
+        'breakouts': [
+            {'mode': '1x100G[40G]', 'ports': '0-%s' % (breakout_start - 4)},
+            {'mode': '4x25G', 'ports': '%s-%s' % (breakout_start, last + 3)},
+        ],
+        'port_descriptions': {port: 'uplink-%s' % (port // 4) for port in range(0, 32, 4)},
+        'port_groups': {
+            'lesw_to_spsw_subint-100G': {'ports': '0-28'},
+            'lesw_to_spsw_trunk-100G': {'ports': '32-36', 'portchannels': '1'},
+            'servers-100G': {'ports': '40-%s' % (breakout_start - 4)},
+            'servers-25G': {'ports': '%s-%s' % (breakout_start, last + 3)},
+        },
+        'portchannels': [{'id': 1, 'ports': '32,36'}],
+        'switched_vlans': vlans,
+        'static_routes': [{'vrfid': 20, 'prefix': '10.%s.%s.0/24' % (100 + n, index % 256), 'nexthop': '10.%s.20.254' % dc_index} for n in range(rng.randint(0, 4))],
+        'bgp': {
+            'prod': {
+                'asn': 4200000000 + dc_index * 10000 + index,
+                'router_id': '10.%s.253.%s' % (dc_index, index % 256),
+                'peer_groups': peer_groups,
+                'redistribute': {'connected': {'metric': 10, 'route_maps': route_maps(rng, 2)}},
+                'aggregated_addresses': [{'prefix': '10.%s.0.0/16' % dc_index, 'origin': 'igp', 'route_map': None, 'suppress_map': None, 'summary_only': True}],
+            }
+        },
+    }
+
+
+def generate_spine(dc_index, index, platform, leaves):
+    ports = PLATFORMS[platform][1]
+    return {
+        'mac': '02:%02x:ff:%02x:00:01' % (dc_index, index),
+        'platform': platform,
+        'breakouts': [{'mode': '1x100G[40G]', 'ports': '0-%s' % (4 * (ports - 1))}],
+        'port_descriptions': {},
+        'port_groups': {'spsw_to_lesw_subint-100G': {'ports': '0-%s' % (4 * (ports - 1))}},
+        'routed_vlans': {11: None},
+        'switched_vlans': {10: None, 20: {'vrfid': 20, 'addresses': ['10.%s.254.%s/24' % (dc_index, index + 1)]}},
+        'static_routes': [],
+        'bgp': {
+            'prod': {
+                'asn': 4200000000 + dc_index * 10000 + 9000 + index,
+                'router_id': '10.%s.254.%s' % (dc_index, index + 1),
+                'peer_groups': {
+                    'PG-SERVERS': None,
+                    'PG-LEAVES': {
+                        'remote_type': 'external',
+                        'neighbors': [{'address': '10.%s.253.%s' % (dc_index, leaf % 256), 'description': 'leaf%03d' % leaf} for leaf in range(leaves)],
+                        'import_route_maps': [{'prefixes': ['permit 10.%s.0.0/16 le 32' % dc_index], 'action': 'permit'}, {'action': 'deny'}],
+                        'export_route_maps': [{'action': 'permit'}],
+                    }
+                },
+            }
+        },
+    }
+
+
+def generate(target_path, datacenters, switches, seed=0):
+    """
+    Writes a synthetic fleet of datacenters x switches (every fourth switch of a datacenter
+    is a spine) together with platforms, default_sku.csv, global config and templates into
+    target_path, so it can be built like the repository itself. The result depends only on the arguments.
+    """
+    rng = random.Random(seed)
+    config_path = target_path / 'config'
+    if config_path.exists():
+        shutil.rmtree(config_path)
+    (config_path / 'platforms').mkdir(parents=True)
+    (config_path / 'dc').mkdir()
+    shutil.copyfile(repo_path / 'config' / 'global.yaml', config_path / 'global.yaml')
+    shutil.copyfile(repo_path / 'config' / 'default_features.json', config_path / 'default_features.json')
+    if (target_path / 'templates').exists():
+        shutil.rmtree(target_path / 'templates')
+    shutil.copytree(repo_path / 'templates', target_path / 'templates')
+
+    for platform, (hwsku, ports) in PLATFORMS.items():
+        (config_path / 'platforms' / (platform + '.json')).write_text(json.dumps(generate_platform(ports), indent=2))
+    (config_path / 'platforms' / 'default_sku.csv').write_text(''.join('%s,%s\n' % (hwsku, platform) for platform, (hwsku, _) in PLATFORMS.items()))
+
+    for dc_index in range(datacenters):
+        dc = 'dc%02d' % dc_index
+        (config_path / 'dc' / (dc + '.yaml')).write_text(yaml.dump(generate_dc(dc_index)))
+        switch_path = config_path / 'switches' / dc
+        switch_path.mkdir(parents=True)
+        spines = max(1, switches // 4)
+        for index in range(switches - spines):
+            platform = rng.choice(list(PLATFORMS))
+            (switch_path / ('leaf%03d.yaml' % index)).write_text(yaml.dump(generate_leaf(rng, dc_index, index, platform, spines)))
+        for index in range(spines):
+            (switch_path / ('spine%02d.yaml' % index)).write_text(yaml.dump(generate_spine(dc_index, index, 'x86_64-synthetic_64x100g-r0', switches - spines)))
+    logger.info('Generated %s datacenters with %s switches each in %s' % (datacenters, switches, target_path))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(prog='fleet', description='Generates synthetic fleet configuration for benchmarks')
+    parser.add_argument('target', help='directory to write config/ and templates/ into')
+    parser.add_argument('-d', '--datacenters', dest='datacenters', type=int, default=2, help='number of datacenters')
+    parser.add_argument('-s', '--switches', dest='switches', type=int, default=8, help='number of switches per datacenter')
+    parser.add_argument('--seed', dest='seed', type=int, default=0, help='random seed')
+    options = parser.parse_args()
+    target = Path(options.target)
+    if target.resolve() == repo_path:
+        sys.exit('Refusing to overwrite configuration of the repository')
+    generate(target, options.datacenters, options.switches, options.seed)
@@ -0,0 +1,44 @@
+import hashlib
+from pathlib import Path
+from dataclasses import dataclass
+
+
+@dataclass
+class Artifact:
+    """
+    Generated file kept on disk, only its location and content digest are held in memory.
+    """
+    path: Path
+    digest: str
+
+    def read_text(self):
+        return self.path.read_text(encoding='utf-8')
+
+
+def file_digest(path):
+    try:
+        return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def write_text(path, text):
+    data = text.encode('utf-8')
+    Path(path).write_bytes(data)
+    return Artifact(Path(path), hashlib.sha256(data).hexdigest())
+
+
+def write_lines(path, lines):
+    """
+    Writes lines joined with new line characters to path without building the whole
+    content in memory and returns the resulting Artifact.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'wb', buffering=1 << 16) as handle:
+        separator = ''
+        for line in lines:
+            chunk = (separator + line).encode('utf-8')
+            handle.write(chunk)
+            digest.update(chunk)
+            separator = '\n'
+    return Artifact(Path(path), digest.hexdigest())
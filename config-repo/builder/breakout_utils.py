@@ -1,4 +1,5 @@
 import re
+from .models.port import PortList
 
 # Class copied from portconfig odule in sonic
 PORT_STR = "Ethernet"
@@ -7,6 +8,9 @@ BRKOUT_PATTERN_GROUPS = 6
 
 class BreakoutCfg(object):
 
+    # Parsed breakout modes shared by all instances, keyed by (mode, number of lanes)
+    _entries_cache = {}
+
     class BreakoutModeEntry:
         def __init__(self, num_ports, default_speed, supported_speed, num_assigned_lanes=None):
             self.num_ports = int(num_ports)
@@ -109,13 +113,19 @@ class BreakoutCfg(object):
             2x50G ---------------> [('2', '50G', None, None, None)]
         """
 
+        key = (bmode, len(self._lanes))
+        if key in BreakoutCfg._entries_cache:
+            return BreakoutCfg._entries_cache[key]
+
         try:
             groups_list = [re.match(BRKOUT_PATTERN, i).groups() for i in bmode.split("+")]
         except Exception as e:
             print(e)
             raise RuntimeError('Breakout mode "{}" validation failed!'.format(bmode))
 
-        return [self._re_group_to_entry(group) for group in groups_list]
+        entries = [self._re_group_to_entry(group) for group in groups_list]
+        BreakoutCfg._entries_cache[key] = entries
+        return entries
 
     def get_config(self):
         # Ensure that we have corret number of configured lanes
@@ -186,3 +196,44 @@ class BreakoutCfg(object):
                 alias_id += 1
 
         return port_speed_dict
+
+
+class BreakoutIndex(object):
+    """
+    Breakout capabilities of a single platform. Configuration of every (port, mode)
+    pair is computed once and then served from the index.
+    """
+
+    def __init__(self, interfaces):
+        self._interfaces = interfaces
+        self._configs = {}
+        self._ranges = {}
+
+    def get_config(self, name, bmode):
+        key = (name, bmode)
+        if key not in self._configs:
+            self._configs[key] = {
+                int(ifname.replace(PORT_STR, '')): properties
+                for ifname, properties in BreakoutCfg(name, bmode, self._interfaces[name]).get_config().items()
+            }
+        return self._configs[key]
+
+    def expand(self, ports, bmode):
+        """
+        Returns the ports of the range which exist on the platform and configuration
+        of all interfaces created by breaking them out, keyed by port id.
+        """
+        key = (PortList(ports), bmode)
+        if key not in self._ranges:
+            used_ports = []
+            interfaces = {}
+            for port_id in key[0]:
+                name = PORT_STR + str(port_id)
+                if name not in self._interfaces:
+                    continue
+                used_ports.append(port_id)
+                interfaces.update(self.get_config(name, bmode))
+            self._ranges[key] = (PortList(used_ports), interfaces)
+        used_ports, interfaces = self._ranges[key]
+        # Interfaces are modified later by config_db generators, every caller gets its own copy
+        return used_ports, {port_id: dict(properties) for port_id, properties in interfaces.items()}
@@ -0,0 +1,124 @@
+import os
+import json
+import shutil
+import hashlib
+from pathlib import Path
+from dataclasses import dataclass
+import logging
+from .artifact import Artifact
+from . import impact
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = '.cache'
+ARTIFACTS = ['config_db.json', 'frr.conf', 'manifest.json']
+
+
+@dataclass
+class CacheEntry:
+    hostname: str
+    datacenter: str
+    mac: str
+    key: str
+    path: Path
+    digests: dict
+
+    def artifacts(self):
+        return {name: Artifact(self.path / name, self.digests[name]) for name in ARTIFACTS}
+
+
+class BuildCache:
+    """
+    Persistent per-switch build cache stored in .cache/switches/<dc>/<hostname>.
+    Every entry records the digests of all files the switch was built from, so it is
+    valid only as long as none of them (nor the builder code) has changed.
+    """
+
+    def __init__(self, root_path, force=False):
+        self.root_path = root_path
+        self.path = root_path / CACHE_DIR / 'switches'
+        self.force = force
+        self._digests = {}
+        self._code_version = None
+        self._templates = None
+
+    def file_digest(self, rel_path):
+        if rel_path not in self._digests:
+            path = self.root_path / rel_path
+            self._digests[rel_path] = hashlib.sha256(path.read_bytes()).hexdigest() if path.exists() else None
+        return self._digests[rel_path]
+
+    def code_version(self):
+        if self._code_version is None:
+            digest = hashlib.sha256()
+            files = sorted((self.root_path / 'builder').glob('**/*.py')) + [self.root_path / 'build']
+            for path in files:
+                digest.update(str(path.relative_to(self.root_path)).encode('utf-8'))
+                digest.update(path.read_bytes())
+            self._code_version = digest.hexdigest()
+        return self._code_version
+
+    def template_paths(self):
+        """
+        Every file under templates/, templates may include each other, so all of them are inputs of every switch.
+        """
+        if self._templates is None:
+            self._templates = [
+                str(path.relative_to(self.root_path))
+                for path in sorted((self.root_path / 'templates').glob('**/*')) if path.is_file()
+            ]
+        return self._templates
+
+    def switch_inputs(self, config):
+        paths = impact.input_paths(config.datacenter, config.hostname, config.platform, config.frr_template)
+        paths += [path for path in self.template_paths() if path not in paths]
+        return {path: self.file_digest(path) for path in paths}
+
+    def entry_path(self, hostname, datacenter):
+        return self.path / datacenter / hostname
+
+    def lookup(self, hostname, datacenter):
+        if self.force:
+            return None
+        path = self.entry_path(hostname, datacenter)
+        try:
+            meta = json.loads((path / 'entry.json').read_text())
+        except (OSError, ValueError):
+            return None
+        if meta.get('code_version') != self.code_version():
+            return None
+        for rel_path, digest in meta['inputs'].items():
+            if digest is None or self.file_digest(rel_path) != digest:
+                return None
+        if any(rel_path not in meta['inputs'] for rel_path in self.template_paths()):
+            return None
+        if not all((path / name).exists() for name in ARTIFACTS):
+            return None
+        return CacheEntry(hostname, datacenter, meta['mac'], meta['key'], path, meta['digests'])
+
+    def store(self, config, artifacts):
+        inputs = self.switch_inputs(config)
+        if None in inputs.values():
+            return
+        code_version = self.code_version()
+        key = hashlib.sha256(json.dumps([inputs, code_version], sort_keys=True).encode('utf-8')).hexdigest()
+        path = self.entry_path(config.hostname, config.datacenter)
+        path.mkdir(parents=True, exist_ok=True)
+        # Files are replaced, never rewritten in place, so nothing sharing their inodes changes
+        for name in ARTIFACTS:
+            tmp = path / ('.' + name + '.tmp')
+            shutil.copyfile(artifacts[name].path, tmp)
+            os.replace(tmp, path / name)
+        digests = {name: artifacts[name].digest for name in ARTIFACTS}
+        meta = {'key': key, 'mac': config.mac, 'code_version': code_version, 'inputs': inputs, 'digests': digests}
+        tmp = path / '.entry.json.tmp'
+        tmp.write_text(json.dumps(meta, indent=4))
+        os.replace(tmp, path / 'entry.json')
+
+    def prune(self, switches):
+        if not self.path.exists():
+            return
+        for dc_path in self.path.iterdir():
+            for path in dc_path.iterdir():
+                if (path.name, dc_path.name) not in switches:
+                    logger.debug('Removing stale cache entry for %s in %s' % (path.name, dc_path.name))
+                    shutil.rmtree(path)
@@ -4,11 +4,13 @@ import shutil
 from pathlib import Path
 import logging
 from .models.config import Config
+from . import resources, serialize, profiling
+from .artifact import write_text
 logger = logging.getLogger(__name__)
 
 def generate_features(config, config_db, root_path):
-    path = root_path / 'config' / 'default_features.json'
-    features = json.loads(path.read_text())
+    # Shared defaults are read-only, every switch gets its own copy
+    features = {name: dict(cfg) for name, cfg in resources.get(root_path).default_features().items()}
     for name, cfg in features.items():
         if name == 'database':
             cfg['high_mem_alert'] = 'enabled'
@@ -54,15 +56,11 @@ def generate_breakout_cfg(config, config_db):
         for port_id in breakout.ports
     }
 
-def generate_ports(config, config_db, interfaces):
+def generate_ports(config, config_db, interfaces, topology):
     config_db['PORT'] = {'Ethernet' + str(x): interfaces[x] for x in interfaces}
     for name, port_group in config.port_groups.items():
         logger.debug('Configuring ports in group %s' % name)
-        ports = port_group.ports
-        for portchannel_id in port_group.portchannels:
-            portchannel = next(filter(lambda x: x.id == portchannel_id, config.portchannels))
-            ports = ports + portchannel.ports
-        for port_id in ports:
+        for port_id in topology.port_group_ports[name]:
             ifname = 'Ethernet' + str(port_id)
             if port_group.fec is not None:
                 config_db['PORT'][ifname]['fec'] = port_group.fec
@@ -113,29 +111,19 @@ def generate_vlan_interfaces(config, config_db):
             vlans["Vlan%s|%s" % (vlanid, address)] = {}
     config_db['VLAN_INTERFACE'] = vlans
 
-def generate_vlan_members(config, config_db):
+def generate_vlan_members(config, config_db, topology):
     members = {}
-    for vlanid, vlan in config.switched_vlans.items():
+    for vlanid, vlan_members in topology.vlan_members.items():
         # Tagged ports
-        ports = vlan.tagged_ports
-        portchannels = vlan.tagged_portchannels
-        for port_group in vlan.tagged_port_groups:
-            ports = ports + config.port_groups[port_group].ports
-            portchannels = portchannels + config.port_groups[port_group].portchannels
-        for portid in ports:
+        for portid in vlan_members.tagged_ports:
             members["Vlan%s|Ethernet%s" % (vlanid, portid)] = { "tagging_mode": "tagged"}
-        for portid in portchannels:
+        for portid in vlan_members.tagged_portchannels:
             members["Vlan%s|PortChannel%04d" % (vlanid, portid)] = { "tagging_mode": "tagged"}
 
         # Untagged ports
-        ports = vlan.untagged_ports
-        portchannels = vlan.untagged_portchannels
-        for port_group in vlan.untagged_port_groups:
-            ports = ports + config.port_groups[port_group].ports
-            portchannels = portchannels + config.port_groups[port_group].portchannels
-        for portid in ports:
+        for portid in vlan_members.untagged_ports:
             members["Vlan%s|Ethernet%s" % (vlanid, portid)] = { "tagging_mode": "untagged"}
-        for portid in portchannels:
+        for portid in vlan_members.untagged_portchannels:
             members["Vlan%s|PortChannel%04d" % (vlanid, portid)] = { "tagging_mode": "untagged"}
     config_db['VLAN_MEMBER'] = members
 
@@ -160,35 +148,55 @@ def generate_portchannel_members(config, config_db):
         for portid in portchannel.ports
     }
 
-def generate_vrfs(config, config_db):
-    unique_vrfs = {
-        vlan.vrfid for vlan in config.switched_vlans.values()
-    }
-    unique_vrfs.update({
-        vlan.vrfid for vlan in config.routed_vlans.values()
-    })
+def generate_vrfs(config, config_db, topology):
     config_db['VRF'] = {
         "Vrf%s" % vrfid: {}
-        for vrfid in list(unique_vrfs)
+        for vrfid in sorted(topology.vrfs)
     }
 
-def generate_vlan_sub_interfaces(config, config_db):
+def generate_vlan_sub_interfaces(config, config_db, topology):
     config_db['VLAN_SUB_INTERFACE'] = {
         "Ethernet%s.%s" % (portid, vlanid): {
             "vrf_name": "Vrf" + str(vlan.vrfid)
         }
         for vlanid, vlan in config.routed_vlans.items()
-        for port_group_id in vlan.port_groups
-        for portid in config.port_groups[port_group_id].ports
+        for portid in topology.routed_vlan_ports[vlanid]
     }
 
 def generate_frr_raw(config, config_db, state):
     config_db['BGP_RAW'] = {
         'ASIC-0': {
-            "frr.conf": state['frr'][(config.hostname, config.datacenter)]
+            "frr.conf": state['frr'][(config.hostname, config.datacenter)].read_text()
         }
     }
 
+def generate_config_db(root_path, config, interfaces, topology):
+    logger.info("Generating config_db for %s in %s" % (config.hostname, config.datacenter))
+    config_db = {}
+    generate_ntp(config, config_db)
+    generate_device_metadata(config, config_db)
+    generate_breakout_cfg(config, config_db)
+    generate_ports(config, config_db, interfaces, topology)
+    generate_features(config, config_db, root_path)
+    generate_vlans(config, config_db)
+    generate_vlan_interfaces(config, config_db)
+    generate_vlan_members(config, config_db, topology)
+    generate_portchannels(config, config_db)
+    generate_portchannel_members(config, config_db)
+    generate_vrfs(config, config_db, topology)
+    generate_static_routes(config, config_db)
+    generate_vlan_sub_interfaces(config, config_db, topology)
+    return config_db
+
+def save_config_db(gen_path, switch, config_db, frr_artifact):
+    """
+    Writes canonical config_db.json and manifest with digests of every table and frr.conf.
+    """
+    name = '.'.join(switch)
+    config_db_file = write_text(gen_path / (name + '.json'), serialize.dumps(config_db))
+    manifest_file = write_text(gen_path / (name + '.manifest.json'), serialize.dumps(serialize.manifest(config_db, frr_artifact.digest)))
+    return config_db_file, manifest_file
+
 def run_step(root_path, state):
     gen_path = root_path / "_build/config_db"
     if gen_path.exists():
@@ -196,25 +204,13 @@ def run_step(root_path, state):
     gen_path.mkdir(parents=True)
 
     state['config_db'] = {}
+    state['config_db_files'] = {}
+    state['manifests'] = {}
     for config in state['parsed_configs']:
         switch = (config.hostname, config.datacenter)
-        logger.info("Generating config_db for %s in %s" % switch)
-
-        config_db = {}
-        generate_ntp(config, config_db)
-        generate_device_metadata(config, config_db)
-        generate_breakout_cfg(config, config_db)
-        generate_ports(config, config_db, state['interfaces'][switch])
-        generate_features(config, config_db, root_path)
-        generate_vlans(config, config_db)
-        generate_vlan_interfaces(config, config_db)
-        generate_vlan_members(config, config_db)
-        generate_portchannels(config, config_db)
-        generate_portchannel_members(config, config_db)
-        generate_vrfs(config, config_db)
-        generate_static_routes(config, config_db)
-        generate_vlan_sub_interfaces(config, config_db)
-        #generate_frr_raw(config, config_db, state)
-
-        state['config_db'][switch] = config_db
-        (gen_path / ('.'.join(switch) + '.json')).write_text(json.dumps(config_db, indent=4))
+        with profiling.switch(state, switch):
+            config_db = generate_config_db(root_path, config, state['interfaces'][switch], state['topology'][switch])
+            #generate_frr_raw(config, config_db, state)
+
+            state['config_db'][switch] = config_db
+            state['config_db_files'][switch], state['manifests'][switch] = save_config_db(gen_path, switch, config_db, state['frr'][switch])
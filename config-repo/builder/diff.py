@@ -0,0 +1,121 @@
+import json
+import difflib
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+import logging
+logger = logging.getLogger(__name__)
+
+# This module is also used by the update hook on switches, keep it free of builder dependencies
+
+
+@dataclass
+class Change:
+    op: str # added, removed, changed
+    path: str # TABLE|key|field
+    old: object = None
+    new: object = None
+
+
+def _diff_fields(table, key, old_fields, new_fields, changes):
+    path = '%s|%s' % (table, key)
+    if not isinstance(old_fields, dict) or not isinstance(new_fields, dict):
+        changes.append(Change('changed', path, old_fields, new_fields))
+        return
+    for field in old_fields.keys() - new_fields.keys():
+        changes.append(Change('removed', '%s|%s' % (path, field), old=old_fields[field]))
+    for field, val in new_fields.items():
+        if field not in old_fields:
+            changes.append(Change('added', '%s|%s' % (path, field), new=val))
+        elif old_fields[field] != val:
+            changes.append(Change('changed', '%s|%s' % (path, field), old_fields[field], val))
+
+
+def _entry_changes(op, table, key, fields, changes):
+    if not isinstance(fields, dict) or len(fields) == 0:
+        changes.append(Change(op, '%s|%s' % (table, key), **{'old' if op == 'removed' else 'new': fields}))
+        return
+    for field, val in fields.items():
+        changes.append(Change(op, '%s|%s|%s' % (table, key, field), **{'old' if op == 'removed' else 'new': val}))
+
+
+def diff_config_db(old, new):
+    """
+    Compares two config_db dicts walking both of them once and returns list of Change
+    records keyed by TABLE|key|field, sorted by path. Entries without fields are
+    reported as TABLE|key.
+    """
+    changes = []
+    for table in old.keys() | new.keys():
+        old_entries = old.get(table, {})
+        new_entries = new.get(table, {})
+        if old_entries == new_entries:
+            continue
+        for key in old_entries.keys() - new_entries.keys():
+            _entry_changes('removed', table, key, old_entries[key], changes)
+        for key, fields in new_entries.items():
+            if key not in old_entries:
+                _entry_changes('added', table, key, fields, changes)
+            elif old_entries[key] != fields:
+                _diff_fields(table, key, old_entries[key], fields, changes)
+    changes.sort(key=lambda change: change.path)
+    return changes
+
+
+def render_changes(changes):
+    lines = []
+    for change in changes:
+        if change.op == 'added':
+            lines.append('+ %s: %s' % (change.path, json.dumps(change.new)))
+        elif change.op == 'removed':
+            lines.append('- %s: %s' % (change.path, json.dumps(change.old)))
+        else:
+            lines.append('~ %s: %s -> %s' % (change.path, json.dumps(change.old), json.dumps(change.new)))
+    return lines
+
+
+def git_show(root_path, rev, path):
+    proc = subprocess.run(['git', 'show', '%s:./%s' % (rev, path)], cwd=str(root_path), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if proc.returncode != 0:
+        return None
+    return proc.stdout.decode('utf-8')
+
+
+def git_switches(root_path, rev):
+    proc = subprocess.run(['git', 'ls-tree', '-r', '--name-only', rev, '--', 'dist/by-host'], cwd=str(root_path), stdout=subprocess.PIPE, check=True)
+    return {tuple(Path(name).parts[2:4]) for name in proc.stdout.decode('utf-8').split('\n') if name.endswith('/config_db.json')}
+
+
+def diff_dist(root_path, rev):
+    """
+    Compares every switch in dist/by-host with its version from git revision rev.
+    Returns dict mapping (datacenter, hostname) to (config_db changes, frr.conf unified diff lines)
+    for switches which have changed.
+    """
+    switches = git_switches(root_path, rev)
+    switches.update(tuple(path.parts[-2:]) for path in (root_path / 'dist' / 'by-host').glob('*/*'))
+    result = {}
+    for dc, hostname in sorted(switches):
+        base = 'dist/by-host/%s/%s/' % (dc, hostname)
+        old_config_db = git_show(root_path, rev, base + 'config_db.json')
+        new_path = root_path / base / 'config_db.json'
+        new_config_db = new_path.read_text() if new_path.exists() else None
+        changes = diff_config_db(json.loads(old_config_db or '{}'), json.loads(new_config_db or '{}'))
+
+        old_frr = git_show(root_path, rev, base + 'frr.conf') or ''
+        new_path = root_path / base / 'frr.conf'
+        new_frr = new_path.read_text() if new_path.exists() else ''
+        frr_diff = list(difflib.unified_diff(old_frr.split('\n'), new_frr.split('\n'), fromfile='old', tofile='new', lineterm=''))
+        if changes or frr_diff:
+            result[(dc, hostname)] = (changes, frr_diff)
+    return result
+
+
+def run_diff(root_path, rev):
+    result = diff_dist(root_path, rev)
+    for (dc, hostname), (changes, frr_diff) in result.items():
+        print('=== %s in %s' % (hostname, dc))
+        for line in render_changes(changes) + frr_diff:
+            print(line)
+    logger.info('%s switches differ from %s' % (len(result), rev))
+    return result
@@ -0,0 +1,80 @@
+import yaml
+import pickle
+import hashlib
+import functools
+import logging
+from .cache import CACHE_DIR
+logger = logging.getLogger(__name__)
+
+# libyaml bindings are much faster, fall back to the pure Python implementation without them
+Loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+Dumper = getattr(yaml, 'CDumper', yaml.Dumper)
+
+
+def dump(obj):
+    return yaml.dump(obj, Dumper=Dumper)
+
+
+class DocumentCache:
+    """
+    Cache of parsed YAML documents keyed by sha256 of the file content, kept in memory and
+    pickled to .cache/yaml, so a file is parsed again only after it has changed.
+    Returned documents are shared, callers must not modify them. Only the latest content of every
+    file is kept in memory, so a long running process (--watch) does not grow with every edit.
+    """
+
+    def __init__(self, root_path):
+        self.path = root_path / CACHE_DIR / 'yaml'
+        self._documents = {}
+        self._digests = {}
+
+    def load(self, path, keep=True):
+        raw = path.read_bytes()
+        digest = hashlib.sha256(raw).hexdigest()
+        if digest in self._documents:
+            document = self._documents[digest]
+        else:
+            document = self._read(path, raw, digest)
+        if keep:
+            previous = self._digests.get(path)
+            if previous is not None and previous != digest:
+                # Another file with the same content only has to be read from the pickle again
+                self._documents.pop(previous, None)
+            self._digests[path] = digest
+            self._documents[digest] = document
+        return document
+
+    def _read(self, path, raw, digest):
+        cache_path = self.path / (digest + '.pickle')
+        try:
+            return pickle.loads(cache_path.read_bytes())
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            logger.debug('Parsing %s' % path)
+            document = yaml.load(raw, Loader=Loader)
+            self.path.mkdir(parents=True, exist_ok=True)
+            tmp = cache_path.with_name(cache_path.name + '.tmp')
+            tmp.write_bytes(pickle.dumps(document, protocol=pickle.HIGHEST_PROTOCOL))
+            tmp.replace(cache_path)
+            return document
+
+    def prune(self, keep):
+        """
+        Removes cached documents whose digest is not in keep.
+        """
+        if not self.path.exists():
+            return
+        for path in self.path.glob('*.pickle'):
+            if path.stem not in keep:
+                path.unlink()
+
+
+@functools.lru_cache(maxsize=None)
+def get(root_path):
+    return DocumentCache(root_path)
+
+
+def load(root_path, path, keep=True):
+    """
+    Returns parsed document, with keep=False it is not held in memory after it has been loaded.
+    """
+    return get(root_path).load(path, keep)
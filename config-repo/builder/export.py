@@ -1,29 +1,92 @@
-import json
+import os
 import shutil
 from pathlib import Path
 import logging
 from .models.config import Config
+from .artifact import file_digest
+from . import profiling
 logger = logging.getLogger(__name__)
 
-def save_config(state, switch, path):
-    logger.info("Exporting configuration for %s in %s" % (switch, path))
-    path.mkdir(parents=True)
+def install_file(src, dest, link=False):
+    """
+    Atomically replaces dest with a copy of src. With link=True the file is hardlinked
+    when possible, only used for by-mac entries sharing storage with files in by-host:
+    sources outside dist/ (_build/ and the build cache) are rewritten by later builds.
+    """
+    tmp = dest.with_name('.' + dest.name + '.tmp')
+    if tmp.exists():
+        tmp.unlink()
+    if link:
+        try:
+            os.link(src, tmp)
+        except OSError:
+            link = False
+    if not link:
+        shutil.copyfile(src, tmp)
+    os.replace(tmp, dest)
 
-    config_db = state['config_db'][switch]
-    (path / 'config_db.json').write_text(json.dumps(config_db, indent=4))
+def save_config(switch, artifacts, path, by_mac_path):
+    for name, artifact in artifacts.items():
+        dest = path / name
+        if file_digest(dest) != artifact.digest:
+            logger.info("Exporting %s for %s in %s" % (name, switch, path))
+            path.mkdir(parents=True, exist_ok=True)
+            install_file(artifact.path, dest)
 
-    frr_config = state['frr'][switch]
-    (path / 'frr.conf').write_text(frr_config)
+        # by-mac is a hardlink to by-host file, not a symlink: the switch reads it with git show
+        mac_dest = by_mac_path / name
+        if not mac_dest.exists() or not (os.path.samefile(dest, mac_dest) or file_digest(mac_dest) == artifact.digest):
+            logger.info("Exporting %s for %s in %s" % (name, switch, by_mac_path))
+            by_mac_path.mkdir(parents=True, exist_ok=True)
+            install_file(dest, mac_dest, link=True)
+
+def remove_stale(dist_path, hosts, macs):
+    for path in (dist_path / 'by-host').glob('*/*'):
+        if (path.parent.name, path.name) not in hosts:
+            logger.info("Removing stale configuration in %s" % path)
+            shutil.rmtree(path)
+    for path in (dist_path / 'by-host').glob('*'):
+        if not any(path.iterdir()):
+            path.rmdir()
+    for path in (dist_path / 'by-mac').glob('*'):
+        if path.name not in macs:
+            logger.info("Removing stale configuration in %s" % path)
+            shutil.rmtree(path)
+
+def export_switch(root_path, state, switch, mac, artifacts):
+    dist_path = root_path / "dist"
+    switch_path = dist_path / 'by-host' / switch[1] / switch[0]
+    with profiling.switch(state, switch):
+        save_config(switch, artifacts, switch_path, dist_path / 'by-mac' / mac)
+
+def finish(root_path, state, exported):
+    """
+    Removes configurations of switches missing from exported list of (switch, mac) pairs.
+    """
+    # Only a subset of switches was built, configurations of the others are left untouched
+    if state.get('selected') is not None:
+        return
+    remove_stale(root_path / "dist", {(switch[1], switch[0]) for switch, _ in exported}, {mac for _, mac in exported})
 
 def run_step(root_path, state):
     dist_path = root_path / "dist"
-    if dist_path.exists():
-        shutil.rmtree(dist_path)
-    dist_path.mkdir(parents=True)
+    dist_path.mkdir(parents=True, exist_ok=True)
 
+    cache = state.get('cache')
+    exports = []
     for config in state['parsed_configs']:
         switch = (config.hostname, config.datacenter)
-        switch_path = dist_path / 'by-host' / config.datacenter / config.hostname
-        save_config(state, switch, switch_path)
-        by_mac_path = (dist_path / 'by-mac' / config.mac)
-        save_config(state, switch, by_mac_path)
+        artifacts = {
+            'config_db.json': state['config_db_files'][switch],
+            'frr.conf': state['frr'][switch],
+            'manifest.json': state['manifests'][switch]
+        }
+        exports.append((switch, config.mac, artifacts))
+        if cache is not None:
+            cache.store(config, artifacts)
+    for entry in state.get('cached', []):
+        exports.append(((entry.hostname, entry.datacenter), entry.mac, entry.artifacts()))
+
+    for switch, mac, artifacts in exports:
+        export_switch(root_path, state, switch, mac, artifacts)
+    finish(root_path, state, [(switch, mac) for switch, mac, _ in exports])
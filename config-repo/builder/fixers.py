@@ -1,57 +1,114 @@
 import json
 import yaml
 import shutil
+import typing
+import functools
 import dataclasses
 from pathlib import Path
 import logging
 from .models.config import Config
 from .models.port import PortList
+from . import resources, profiling
 logger = logging.getLogger(__name__)
 
 def load_default_sku_config(root_path):
-    raw = (root_path / 'config' / 'platforms' / 'default_sku.csv').read_text()
-    return {line.split(',')[1]: line.split(',')[0] for line in raw.split('\n') if len(line) > 0}
+    return resources.get(root_path).default_sku()
+
+def set_hwsku(config, default_sku):
+    switch = (config.hostname, config.datacenter)
+    logger.debug("Searching for hwsku for %s in %s" % switch)
+    if config.hwsku is not None:
+        logger.debug('Switch %s in %s already has hwsku set: %s' % (switch[0], switch[1], config.hwsku))
+        return
+    hwsku = default_sku.get(config.platform)
+    if hwsku is None:
+        raise Exception('Cannot find hwsku for switch %s in %s' % switch)
+    logger.debug('Setting hwsku: "%s" for %s in %s' % (hwsku, switch[0], switch[1]))
+    config.hwsku = hwsku
 
 def find_hwsku(root_path, state):
     logger.info('Searching for hwsku for switches')
     default_sku = load_default_sku_config(root_path)
     for config in state['parsed_configs']:
-        switch = (config.hostname, config.datacenter)
-        logger.debug("Searching for hwsku for %s in %s" % switch)
-        if config.hwsku is not None:
-            logger.debug('Switch %s in %s already has hwsku set: %s' % (switch[0], switch[1], config.hwsku))
-            continue
-        hwsku = default_sku.get(config.platform)
-        if hwsku is None:
-            raise Exception('Cannot find hwsku for switch %s in %s' % switch)
-        logger.debug('Setting hwsku: "%s" for %s in %s' % (hwsku, switch[0], switch[1]))
-        config.hwsku = hwsku
+        set_hwsku(config, default_sku)
 
 def clean_ports_list(ports, interfaces):
-    return [x for x in ports if x in interfaces]
+    return PortList(ports) & interfaces
+
+def _compile_type_cleaner(type_, field_name):
+    if type_ is PortList:
+        if "portchannels" in field_name:
+            return None
+        return clean_ports_list
+    if dataclasses.is_dataclass(type_):
+        return compile_ports_cleaner(type_)
+    origin, args = typing.get_origin(type_), typing.get_args(type_)
+    if origin is list:
+        item_cleaner = _compile_type_cleaner(args[0], field_name)
+        if item_cleaner is None:
+            return None
+        def clean_list(val, interfaces):
+            for index, item in enumerate(val):
+                val[index] = item_cleaner(item, interfaces)
+            return val
+        return clean_list
+    if origin is dict:
+        value_cleaner = _compile_type_cleaner(args[1], field_name)
+        if value_cleaner is None:
+            return None
+        def clean_dict(val, interfaces):
+            for key, item in val.items():
+                val[key] = value_cleaner(item, interfaces)
+            return val
+        return clean_dict
+    if origin is typing.Union:
+        cleaners = [(arg, _compile_type_cleaner(arg, field_name)) for arg in args if arg is not type(None)]
+        cleaners = [(arg, cleaner) for arg, cleaner in cleaners if cleaner is not None]
+        if len(cleaners) == 0:
+            return None
+        def clean_union(val, interfaces):
+            for arg, cleaner in cleaners:
+                if isinstance(val, typing.get_origin(arg) or arg):
+                    return cleaner(val, interfaces)
+            return val
+        return clean_union
+    return None
+
+@functools.lru_cache(maxsize=None)
+def compile_ports_cleaner(cls):
+    """
+    Builds function removing not available ports from every PortList reachable from dataclass cls.
+    The schema is analyzed once, generated function visits only fields which can hold a PortList.
+    Returns None if there is nothing to clean in cls.
+    """
+    field_cleaners = []
+    for name, type_ in typing.get_type_hints(cls).items():
+        cleaner = _compile_type_cleaner(type_, name)
+        if cleaner is not None:
+            field_cleaners.append((name, cleaner))
+    if len(field_cleaners) == 0:
+        return None
+
+    def clean_dataclass(obj, interfaces):
+        for name, cleaner in field_cleaners:
+            val = getattr(obj, name)
+            if val is not None:
+                setattr(obj, name, cleaner(val, interfaces))
+        return obj
+    return clean_dataclass
 
 def deep_clean_ports_lists(config, interfaces):
-    if dataclasses.is_dataclass(config):
-        iter_list = list(config.__dict__.items())
-        for key, val in iter_list:
-            if isinstance(val, PortList) and "portchannels" not in key:
-                setattr(config, key, clean_ports_list(val, interfaces))
-            else:
-                setattr(config, key,deep_clean_ports_lists(val, interfaces))
-    if isinstance(config, dict):
-        for key, val in config.items():
-            if isinstance(val, PortList) and "portchannels" not in key:
-                config[key] = clean_ports_list(val, interfaces)
-            else:
-                config[key] = deep_clean_ports_lists(val, interfaces)
-    if isinstance(config, list):
-        config = [clean_ports_list(x) if isinstance(x, PortList) else deep_clean_ports_lists(x, interfaces) for x in config]
-    return config
+    cleaner = compile_ports_cleaner(type(config))
+    return cleaner(config, interfaces) if cleaner is not None else config
+
+def remove_unused_ports(config, interfaces):
+    logger.debug("Remove unused breakout ports for %s in %s" % (config.hostname, config.datacenter))
+    deep_clean_ports_lists(config, PortList(interfaces))
 
 def run_step(root_path, state):
     logger.info('Running fixers')
     find_hwsku(root_path, state)
     for config in state['parsed_configs']:
         switch = (config.hostname, config.datacenter)
-        logger.debug("Remove unused breakout ports for %s in %s" % switch)
-        deep_clean_ports_lists(config, state['interfaces'][switch])
+        with profiling.switch(state, switch):
+            remove_unused_ports(config, state['interfaces'][switch])
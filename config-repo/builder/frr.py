@@ -5,35 +5,84 @@ from pathlib import Path
 import logging
 from .models.config import Config
 from .models.port import PortList
-from dataclasses import asdict
-import jinja2
+from collections.abc import Mapping
+from dataclasses import fields
+from . import resources, profiling
+from .artifact import write_lines
 logger = logging.getLogger(__name__)
 
 
+class DataclassView(Mapping):
+    """
+    Read-only mapping of dataclass fields used as template context. Nested values are
+    passed as they are, Jinja resolves item lookups on dataclasses with getattr.
+    """
+
+    def __init__(self, obj):
+        self._obj = obj
+        self._fields = tuple(f.name for f in fields(obj))
+
+    def __getitem__(self, key):
+        if key not in self._fields:
+            raise KeyError(key)
+        return getattr(self._obj, key)
+
+    def __iter__(self):
+        return iter(self._fields)
+
+    def __len__(self):
+        return len(self._fields)
+
+
+def create_environment(root_path):
+    return resources.get(root_path).frr_environment()
+
+
+def precompile_templates(env):
+    # Compile every template up front, worker processes inherit them already loaded
+    for name in env.list_templates():
+        env.get_template(name)
+
+
+def render_config_to_file(env, config, topology, path):
+    """
+    Renders FRR config of the switch, template output is indented chunk by chunk
+    and written directly to path. Returns Artifact with digest of the file.
+    """
+    logger.info("Generating configuration for %s in %s" % (config.hostname, config.datacenter))
+    template = env.get_template(config.frr_template)
+    chunks = template.generate(DataclassView(config), topology=topology)
+    return write_lines(path, prettify_frr_lines(chunks))
+
+
 def run_step(root_path, state):
     gen_path = root_path / "_build/frr"
     if gen_path.exists():
         shutil.rmtree(gen_path)
     gen_path.mkdir(parents=True)
 
-    env = jinja2.Environment(loader=jinja2.FileSystemLoader(str(root_path / 'templates')))
-    env.globals['enumerate'] = enumerate
-    env.globals['len'] = len
+    env = create_environment(root_path)
+    precompile_templates(env)
     state['frr'] = {}
     for config in state['parsed_configs']:
         switch = (config.hostname, config.datacenter)
-        logger.info("Generating configuration for %s in %s" % switch)
-        template = env.get_template(config.frr_template)
-        rendered = template.render(asdict(config, dict_factory=dict))
-        rendered = prettify_frr(rendered)
-        state['frr'][switch] = rendered
-        (gen_path / ('.'.join(switch) + '.conf')).write_text(rendered)
+        path = gen_path / ('.'.join(switch) + '.conf')
+        with profiling.switch(state, switch):
+            state['frr'][switch] = render_config_to_file(env, config, state['topology'][switch], path)
 
 
-def prettify_frr(cfg):
-    output = []
+def split_lines(chunks):
+    pending = ''
+    for chunk in chunks:
+        lines = (pending + chunk).split('\n')
+        pending = lines.pop()
+        yield from lines
+    yield pending
+
+
+def prettify_frr_lines(chunks):
     tabs = 0
-    for line in cfg.split('\n'):
+    for line in split_lines(chunks):
         line = line.strip()
         if len(line) == 0:
             continue
@@ -42,10 +91,8 @@ def prettify_frr(cfg):
             if line.startswith(tag):
                 tabs -= 1
                 break
-        output.append('  ' * tabs + line)
+        yield '  ' * tabs + line
         for tag in ['router', 'address-family', 'route-map']:
             if line.startswith(tag):
                 tabs += 1
                 break
-
-    return '\n'.join(output)
@@ -0,0 +1,123 @@
+import subprocess
+from pathlib import Path
+import logging
+from . import documents
+logger = logging.getLogger(__name__)
+
+# Changes in these files affect every switch
+GLOBAL_INPUTS = [
+    'build',
+    'config/global.yaml',
+    'config/platforms/default_sku.csv',
+    'config/default_features.json',
+]
+
+
+def input_paths(datacenter, hostname, platform, frr_template):
+    """
+    Files (relative to the repository root) the build of a single switch depends on,
+    builder code excluded.
+    """
+    return [
+        'config/global.yaml',
+        'config/dc/%s.yaml' % datacenter,
+        'config/switches/%s/%s.yaml' % (datacenter, hostname),
+        'config/platforms/%s.json' % platform,
+        'config/platforms/default_sku.csv',
+        'config/default_features.json',
+        'templates/%s' % frr_template,
+    ]
+
+
+def list_switches(root_path):
+    return [
+        (path.stem.split('.')[0], path.parent.name)
+        for path in sorted((root_path / 'config' / 'switches').glob('*/*.yaml'))
+    ]
+
+
+def _layered_value(layers, key):
+    value = None
+    for layer in layers:
+        if isinstance(layer, dict) and key in layer:
+            value = layer[key]
+    return value
+
+
+def dependency_graph(root_path):
+    """
+    Maps every switch (hostname, datacenter) to the list of input files it is built from.
+    Only platform and frr_template are resolved from the config hierarchy, nothing is fully merged.
+    """
+    config_path = root_path / 'config'
+    global_config = documents.load(root_path, config_path / 'global.yaml')
+    dc_configs = {}
+    graph = {}
+    for hostname, dc in list_switches(root_path):
+        if dc not in dc_configs:
+            dc_path = config_path / 'dc' / (dc + '.yaml')
+            dc_configs[dc] = documents.load(root_path, dc_path) if dc_path.exists() else {}
+        switch_config = documents.load(root_path, config_path / 'switches' / dc / (hostname + '.yaml'))
+        layers = [global_config, dc_configs[dc], switch_config]
+        graph[(hostname, dc)] = input_paths(dc, hostname, _layered_value(layers, 'platform'), _layered_value(layers, 'frr_template'))
+    return graph
+
+
+def affected_switches(root_path, changed_files):
+    """
+    Returns set of switches (hostname, datacenter) which have to be rebuilt after changed_files
+    (paths relative to the repository root) have changed.
+    """
+    switches = list_switches(root_path)
+    changed_files = set(changed_files)
+    if any(path in GLOBAL_INPUTS or (path.startswith('builder/') and path.endswith('.py')) for path in changed_files):
+        return set(switches)
+
+    affected = set()
+    graph = None
+    for path in changed_files:
+        parts = Path(path).parts
+        if len(parts) == 3 and parts[:2] == ('config', 'dc'):
+            affected.update(switch for switch in switches if switch[1] == Path(path).stem)
+        elif len(parts) == 4 and parts[:2] == ('config', 'switches'):
+            switch = (Path(path).stem, parts[2])
+            if switch in switches:
+                affected.add(switch)
+        elif parts[:2] == ('config', 'platforms') or parts[:1] == ('templates',):
+            if graph is None:
+                graph = dependency_graph(root_path)
+            referenced = [switch for switch, inputs in graph.items() if path in inputs]
+            if parts[:1] == ('templates',) and len(referenced) == 0:
+                # Template included by other templates
+                return set(switches)
+            affected.update(referenced)
+    return affected
+
+
+def changed_since(root_path, rev):
+    def git(*args):
+        proc = subprocess.run(['git'] + list(args), cwd=str(root_path), stdout=subprocess.PIPE, check=True)
+        return [line for line in proc.stdout.decode('utf-8').split('\n') if line]
+    return git('diff', '--name-only', '--relative', rev, '--', '.') + git('ls-files', '--others', '--exclude-standard', '--', '.')
+
+
+def select_switches(root_path, since=None, only=None):
+    """
+    Returns set of switches to build for --since and --only options or None when every switch should be built.
+    """
+    if since is None and not only:
+        return None
+    selected = set()
+    if since is not None:
+        changed = changed_since(root_path, since)
+        removed = [path for path in changed if path.startswith('config/') and not (root_path / path).exists()]
+        if removed:
+            # Stale dist entries are removed only by a full build, the rest comes from the build cache
+            logger.info('%s removed since %s, building every switch' % (', '.join(removed), since))
+            return None
+        selected.update(affected_switches(root_path, changed))
+        logger.info('%s files changed since %s, %s switches affected' % (len(changed), since, len(selected)))
+    for name in only or []:
+        dc, hostname = name.split('/')
+        selected.add((hostname, dc))
+    return selected
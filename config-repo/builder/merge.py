@@ -1,65 +1,160 @@
 import json
-import yaml
 import shutil
 from pathlib import Path
+from collections.abc import Mapping
 import logging
+from . import profiling, documents
 logger = logging.getLogger(__name__)
 
 
-def selective_merge(base_obj, delta_obj):
-    if not isinstance(base_obj, dict) or not isinstance(delta_obj, dict):
-        return delta_obj
-    common_keys = set(base_obj).intersection(delta_obj)
-    new_keys = set(delta_obj).difference(common_keys)
-    ret = dict(base_obj)
-    for k in common_keys:
-        if k in delta_obj and delta_obj[k] is None:
-            del ret[k]
-        else:
-            ret[k] = selective_merge(base_obj[k], delta_obj[k])
-    for k in new_keys:
-        if k in delta_obj and delta_obj[k] is None:
-            continue
-        ret[k] = delta_obj[k]
-    return ret
+class MergedView(Mapping):
+    """
+    Read-only view of layered configs merged from the first (base) layer to the last one: dicts are
+    merged recursively, null values delete the key and other values replace the lower layers.
+    Nothing is copied, nested dicts present in more layers are returned as views over those layers,
+    so switches of one DC share all unchanged subtrees.
+    Layers are (source, dict) pairs, the source of every value is available with origin().
+    """
+    __slots__ = ['layers']
 
+    def __init__(self, layers):
+        self.layers = tuple(layers)
 
-def run_step(root_path, state):
-    # Prepare build directory
+    def _resolve(self, key):
+        # Returns list of (source, value) layers providing the value, empty when the key is missing
+        resolved = []
+        for index, (source, layer) in enumerate(self.layers):
+            if key not in layer:
+                continue
+            val = layer[key]
+            if index == 0:
+                # Base layer is taken as it is, including null values
+                resolved = [(source, val)]
+            elif val is None:
+                resolved = []
+            elif len(resolved) > 0 and isinstance(resolved[-1][1], dict) and isinstance(val, dict):
+                resolved.append((source, val))
+            else:
+                resolved = [(source, val)]
+        return resolved
+
+    def __getitem__(self, key):
+        resolved = self._resolve(key)
+        if len(resolved) == 0:
+            raise KeyError(key)
+        if len(resolved) == 1:
+            return resolved[0][1]
+        return MergedView(resolved)
+
+    def _keys(self):
+        keys = {}
+        for index, (_, layer) in enumerate(self.layers):
+            for key, val in layer.items():
+                if index == 0:
+                    keys[key] = None
+                elif val is None:
+                    keys.pop(key, None)
+                elif key not in keys:
+                    keys[key] = None
+        return keys
+
+    def __iter__(self):
+        return iter(self._keys())
+
+    def __len__(self):
+        return len(self._keys())
+
+    def __contains__(self, key):
+        return len(self._resolve(key)) > 0
+
+    def origin(self, key):
+        """
+        Returns sources of layers the value of key comes from, the last one has the final say.
+        """
+        return [source for source, _ in self._resolve(key)]
+
+    def extend(self, source, layer):
+        return MergedView(self.layers + ((source, layer),))
+
+
+def materialize(obj):
+    """
+    Converts MergedView with all nested views to plain dicts.
+    """
+    if isinstance(obj, MergedView):
+        return {key: materialize(val) for key, val in obj.items()}
+    return obj
+
+
+def merge_switches(root_path, state):
+    """
+    Yields merged config of every switch which is selected and not up to date in the build cache,
+    cached switches are collected in state['cached'] instead. Merged DC configs are kept in state.
+    """
+    # Merged configs are written to the build directory only when they are kept (-k) or debugged
     gen_path = root_path / "_build/merged_config"
+    dump_configs = state.get('dump_intermediates', False)
     if gen_path.exists():
         shutil.rmtree(gen_path)
-    gen_path.mkdir(parents=True)
-    
     gen_dc_path = gen_path / "dc"
-    gen_dc_path.mkdir()
     gen_switch_path = gen_path / "switch"
-    gen_switch_path.mkdir()
+    if dump_configs:
+        gen_dc_path.mkdir(parents=True)
+        gen_switch_path.mkdir(parents=True)
 
     config_path = root_path / "config"
-    global_config = yaml.safe_load(Path(config_path / "global.yaml").read_text())
+    global_config = documents.load(root_path, config_path / "global.yaml")
     dc_config_paths = (config_path / 'dc').glob('*.yaml')
     
     state['merged_configs'] = {'datacenters': [], 'switches': []}
+    state['cached'] = []
+    cache = state.get('cache')
+    selected = state.get('selected')
+    # Switch configs are not kept in memory when switches are streamed one by one
+    streaming = state.get('streaming', False)
+    switches = set()
     for dc_config_path in dc_config_paths:
         dc = dc_config_path.stem.split('.')[0]
-        logger.info('Merging config for DC: ' + dc)
-
-        dc_config = yaml.safe_load(dc_config_path.read_text())
-        dc_config = selective_merge(global_config, dc_config)
-        dc_config['datacenter'] = dc
+        dc_config = None
+        if dump_configs:
+            (gen_switch_path / dc).mkdir()
 
-        state['merged_configs']['datacenters'].append(dc_config)
-        (gen_dc_path / (dc + '.yaml')).write_text(yaml.dump(dc_config))
-        
-        (gen_switch_path / dc).mkdir()
-    
         for switch_config_path in (config_path / 'switches' / dc).glob('./*.yaml'):
             hostname = switch_config_path.stem.split('.')[0]
-            logger.info('Merging config for %s in %s' % (hostname, dc))
-            switch_delta_config = yaml.safe_load(switch_config_path.read_text())
-            switch_config = selective_merge(dc_config, switch_delta_config)
-            switch_config['datacenter'] = dc
-            switch_config['hostname'] = hostname
-            state['merged_configs']['switches'].append(switch_config)
-            (gen_switch_path / dc / (hostname + '.yaml')).write_text(yaml.dump(switch_config))
+            switches.add((hostname, dc))
+            if selected is not None and (hostname, dc) not in selected:
+                continue
+            entry = cache.lookup(hostname, dc) if cache is not None else None
+            if entry is not None:
+                logger.info('Config for %s in %s is up to date, using cached build' % (hostname, dc))
+                state['cached'].append(entry)
+                continue
+
+            if dc_config is None:
+                logger.info('Merging config for DC: ' + dc)
+                dc_config = MergedView([('config/global.yaml', global_config)])
+                dc_config = dc_config.extend('config/dc/%s.yaml' % dc, documents.load(root_path, dc_config_path))
+                dc_config = dc_config.extend('builder', {'datacenter': dc})
+                state['merged_configs']['datacenters'].append(dc_config)
+                if dump_configs:
+                    (gen_dc_path / (dc + '.yaml')).write_text(documents.dump(materialize(dc_config)))
+
+            with profiling.switch(state, (hostname, dc)):
+                logger.info('Merging config for %s in %s' % (hostname, dc))
+                switch_config = dc_config.extend('config/switches/%s/%s.yaml' % (dc, hostname), documents.load(root_path, switch_config_path, keep=not streaming))
+                switch_config = switch_config.extend('builder', {'datacenter': dc, 'hostname': hostname})
+                if dump_configs:
+                    (gen_switch_path / dc / (hostname + '.yaml')).write_text(documents.dump(materialize(switch_config)))
+            yield switch_config
+
+    if selected is not None:
+        for hostname, dc in sorted(selected - switches):
+            logger.warning('Switch %s in %s was selected but has no config' % (hostname, dc))
+    elif cache is not None:
+        cache.prune(switches)
+        documents.get(root_path).prune({cache.file_digest(str(path.relative_to(root_path))) for path in config_path.glob('**/*.yaml')})
+
+
+def run_step(root_path, state):
+    switches = list(merge_switches(root_path, state))
+    state['merged_configs']['switches'] = switches
@@ -2,19 +2,19 @@ from dataclasses import dataclass, field
 from typing import List, Dict, Union, Optional
 from enum import Enum
 
-@dataclass
+@dataclass(slots=True)
 class BGPRouteMap:
     action: str
     match: Dict[str, Union[str, int]] = field(default_factory=dict)
     set: Dict[str, Union[str, int]] = field(default_factory=dict)
     prefixes: List[str] = field(default_factory=list)
 
-@dataclass
+@dataclass(slots=True)
 class BGPNeighbor:
     address: str
     description: str
 
-@dataclass
+@dataclass(slots=True)
 class BGPPeerGroup:
     remote_type: str = "external"
     import_route_maps: List[BGPRouteMap] = field(default_factory=list)
@@ -22,12 +22,12 @@ class BGPPeerGroup:
     unnumbered_bgp_port_groups: List[str] = field(default_factory=list)
     neighbors: List[BGPNeighbor] = field(default_factory=list)
 
-@dataclass
+@dataclass(slots=True)
 class BGPRedistribute:
     metric: Optional[int]
     route_maps: List[BGPRouteMap] = field(default_factory=list)
 
-@dataclass
+@dataclass(slots=True)
 class BGPPrefixAggregate:
     prefix: str
     origin: Optional[str]
@@ -37,7 +37,7 @@ class BGPPrefixAggregate:
     summary_only: bool = False
     matching_med_only: bool = False
 
-@dataclass
+@dataclass(slots=True)
 class BGPConfig:
     vrfid: int
     asn: int
@@ -1,22 +1,23 @@
 from dataclasses import dataclass, field
-from dacite import from_dict, Config as DaciteConfig
+import yaml
 from typing import Dict, List, Optional
 from enum import Enum
 from .bgp import BGPConfig
 from .port import PortBreakout, PortGroupConfig, PortChannelConfig, PortList
 from .vlan import SwitchedVlan, RoutedVlan
+from .loader import Loader
 
 class ServiceState(Enum):
     enabled = "enabled"
     disabled = "disabled"  
 
-@dataclass
+@dataclass(slots=True)
 class StaticRoute:
     nexthop: str
     prefix: str
     vrfid: int
 
-@dataclass
+@dataclass(slots=True)
 class Config:
     datacenter: str
     hostname: str
@@ -40,4 +41,8 @@ class Config:
         if path is not None:
             with open(path, 'r') as handle:
                 obj = yaml.safe_load(handle)
-        return from_dict(data_class=Config, data=obj, config=DaciteConfig(cast=[PortList, ServiceState]))
+        return loader.load(Config, obj)
+
+
+# Shared by all switches, loaders of the dataclasses are generated on first use
+loader = Loader(cast=[PortList, ServiceState])
@@ -0,0 +1,123 @@
+import typing
+import dataclasses
+from collections.abc import Mapping
+from dacite.exceptions import DaciteFieldError, WrongTypeError, MissingValueError, UnionMatchError
+
+
+class Loader:
+    """
+    Builds dataclass instances from parsed configs like dacite.from_dict with check_types
+    and the given cast types, raising the same dacite exceptions. Type hints are resolved
+    once per class and turned into specialized converter and checker functions, the loader
+    of every dataclass is generated as Python source and compiled.
+    """
+
+    def __init__(self, cast=()):
+        self.cast = tuple(cast)
+        self._loaders = {}
+        self._converters = {}
+
+    def load(self, cls, data):
+        return self.loader(cls)(data)
+
+    def loader(self, cls):
+        if cls not in self._loaders:
+            # Placeholder resolves recursive references while the loader is being generated
+            self._loaders[cls] = lambda data: self._loaders[cls](data)
+            self._loaders[cls] = self._compile(cls)
+        return self._loaders[cls]
+
+    def converter(self, type_):
+        """
+        Returns (convert, check) functions for type_, convert builds the value from raw data
+        and check tells whether the result matches the type.
+        """
+        if type_ not in self._converters:
+            self._converters[type_] = self._make_converter(type_)
+        return self._converters[type_]
+
+    def _make_converter(self, type_):
+        origin = typing.get_origin(type_)
+        args = typing.get_args(type_)
+        if type_ is typing.Any:
+            return (lambda data: data), (lambda val: True)
+
+        if origin is typing.Union:
+            if len(args) == 2 and type(None) in args:
+                convert_inner, check_inner = self.converter(args[0] if args[1] is type(None) else args[1])
+                return (lambda data: None if data is None else convert_inner(data)), (lambda val: val is None or check_inner(val))
+            inner = [self.converter(arg) for arg in args]
+            optional = type(None) in args
+
+            def convert_union(data):
+                if optional and data is None:
+                    return None
+                for convert, check in inner:
+                    try:
+                        val = convert(data)
+                    except Exception:
+                        continue
+                    if check(val):
+                        return val
+                raise UnionMatchError(field_type=type_, value=data)
+            return convert_union, (lambda val: any(check(val) for _, check in inner))
+
+        if origin in (list, typing.List):
+            convert_item, check_item = self.converter(args[0] if args else typing.Any)
+            return ((lambda data: [convert_item(item) for item in data] if isinstance(data, list) else data),
+                    (lambda val: isinstance(val, list) and all(check_item(item) for item in val)))
+
+        if origin in (dict, typing.Dict):
+            check_key = self.converter(args[0] if args else typing.Any)[1]
+            convert_val, check_val = self.converter(args[1] if args else typing.Any)
+            # Keys are not converted, the same as in dacite
+            return ((lambda data: {key: convert_val(val) for key, val in data.items()} if isinstance(data, Mapping) else data),
+                    (lambda val: isinstance(val, dict) and all(check_key(k) and check_val(v) for k, v in val.items())))
+
+        if dataclasses.is_dataclass(type_):
+            load = self.loader(type_)
+            return (lambda data: load(data) if isinstance(data, Mapping) else data), (lambda val: isinstance(val, type_))
+
+        if any(isinstance(type_, type) and issubclass(type_, cast_type) for cast_type in self.cast):
+            return type_, (lambda val: isinstance(val, type_))
+
+        if type_ is float:
+            return (lambda data: data), (lambda val: isinstance(val, (int, float)))
+        return (lambda data: data), (lambda val: isinstance(val, type_))
+
+    def _compile(self, cls):
+        hints = typing.get_type_hints(cls)
+        namespace = {
+            'cls': cls,
+            'DaciteFieldError': DaciteFieldError,
+            'WrongTypeError': WrongTypeError,
+            'MissingValueError': MissingValueError,
+        }
+        lines = ['def load_%s(data):' % cls.__name__, '    values = {}']
+        for index, field in enumerate(dataclasses.fields(cls)):
+            if not field.init:
+                continue
+            type_ = hints[field.name]
+            namespace['convert_%s' % index], namespace['check_%s' % index] = self.converter(type_)
+            namespace['type_%s' % index] = type_
+            lines += [
+                '    if %r in data:' % field.name,
+                '        try:',
+                '            value = convert_%s(data[%r])' % (index, field.name),
+                '        except DaciteFieldError as error:',
+                '            error.update_path(%r)' % field.name,
+                '            raise',
+                '        if not check_%s(value):' % index,
+                '            raise WrongTypeError(field_path=%r, field_type=type_%s, value=value)' % (field.name, index),
+                '        values[%r] = value' % field.name,
+            ]
+            has_default = field.default is not dataclasses.MISSING or field.default_factory is not dataclasses.MISSING
+            if has_default:
+                continue
+            if typing.get_origin(type_) is typing.Union and type(None) in typing.get_args(type_):
+                lines += ['    else:', '        values[%r] = None' % field.name]
+            else:
+                lines += ['    else:', '        raise MissingValueError(%r)' % field.name]
+        lines.append('    return cls(**values)')
+        exec('\n'.join(lines), namespace)
+        return namespace['load_%s' % cls.__name__]
@@ -1,33 +1,117 @@
 from dataclasses import dataclass, field
 from typing import List
 from enum import Enum
-from types import GeneratorType
+import bisect
+
+class PortList(object):
+    """
+    Set of port ids kept as a sorted tuple of inclusive (first, last) ranges, e.g. "0-72,124".
+    Iterating yields port ids in ascending order, "+" and "|" return union, "&" intersection.
+    """
+    __slots__ = ('_ranges',)
 
-class PortList(list):
     def __init__(self, val=None):
-        super().__init__(PortList._parse_value(val))
+        self._ranges = PortList._parse_value(val)
+
     @staticmethod
     def _parse_value(val):
-        if isinstance(val, GeneratorType) or isinstance(val, list):
-            return val
-        if val is None or len(str(val)) == 0:
-            return []
-        ports = []
-        parts = str(val).split(',')
-        for part in parts:
-            if '-' in part:
-                first, last = tuple([int(x) for x in part.split('-')])
-                ports = ports + list(range(first, last + 1))
+        if isinstance(val, PortList):
+            return val._ranges
+        if val is None or (isinstance(val, str) and len(val) == 0):
+            return ()
+        if isinstance(val, (str, int)):
+            ranges = []
+            for part in str(val).split(','):
+                if '-' in part:
+                    first, last = tuple([int(x) for x in part.split('-')])
+                    ranges.append((first, last))
+                else:
+                    ranges.append((int(part), int(part)))
+            return PortList._normalize(ranges)
+        return PortList._normalize([(x, x) for x in val])
+
+    @staticmethod
+    def _normalize(ranges):
+        result = []
+        for first, last in sorted(ranges):
+            if first > last:
+                continue
+            if result and first <= result[-1][1] + 1:
+                if last > result[-1][1]:
+                    result[-1] = (result[-1][0], last)
             else:
-                ports.append(int(part))
+                result.append((first, last))
+        return tuple(result)
+
+    @property
+    def ranges(self):
+        return self._ranges
+
+    def __iter__(self):
+        for first, last in self._ranges:
+            yield from range(first, last + 1)
+
+    def __len__(self):
+        return sum(last - first + 1 for first, last in self._ranges)
+
+    def __bool__(self):
+        return len(self._ranges) > 0
+
+    def __contains__(self, port_id):
+        index = bisect.bisect_right(self._ranges, (port_id, float('inf'))) - 1
+        return index >= 0 and self._ranges[index][0] <= port_id <= self._ranges[index][1]
+
+    def union(self, other):
+        return PortList._from_ranges(PortList._normalize(self._ranges + PortList(other)._ranges))
+
+    def intersection(self, other):
+        if not isinstance(other, PortList):
+            return PortList(x for x in self if x in other)
+        result = []
+        a, b = self._ranges, other._ranges
+        i = j = 0
+        while i < len(a) and j < len(b):
+            first, last = max(a[i][0], b[j][0]), min(a[i][1], b[j][1])
+            if first <= last:
+                result.append((first, last))
+            if a[i][1] < b[j][1]:
+                i += 1
+            else:
+                j += 1
+        return PortList._from_ranges(tuple(result))
+
+    @staticmethod
+    def _from_ranges(ranges):
+        ports = PortList()
+        ports._ranges = ranges
         return ports
 
-@dataclass
+    __or__ = union
+    __add__ = union
+    __and__ = intersection
+
+    def __eq__(self, other):
+        if isinstance(other, PortList):
+            return self._ranges == other._ranges
+        if isinstance(other, (list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self._ranges)
+
+    def __str__(self):
+        return ','.join(str(first) if first == last else '%s-%s' % (first, last) for first, last in self._ranges)
+
+    def __repr__(self):
+        return 'PortList(%r)' % str(self)
+
+@dataclass(slots=True)
 class PortBreakout:
     mode: str
     ports: PortList
 
-@dataclass
+@dataclass(slots=True)
 class PortGroupConfig:
     admin_status: str = "down"
     fec: str = None
@@ -35,7 +119,7 @@ class PortGroupConfig:
     ports: PortList = field(default_factory=PortList)
     portchannels: PortList = field(default_factory=PortList)
 
-@dataclass
+@dataclass(slots=True)
 class PortChannelConfig:
     ports: PortList
     id: int
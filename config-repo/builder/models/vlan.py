@@ -3,13 +3,13 @@ from typing import List
 from enum import Enum
 from .port import PortList
 
-@dataclass
+@dataclass(slots=True)
 class RoutedVlan:
     vrfid: int
     port_groups: List[str] = field(default_factory=list)
     ports: PortList = field(default_factory=PortList)
 
-@dataclass
+@dataclass(slots=True)
 class SwitchedVlan:
     vrfid: int
     addresses: List[str] = field(default_factory=list)
@@ -4,12 +4,16 @@ import shutil
 from pathlib import Path
 import logging
 from .models.config import Config
+from . import profiling
 logger = logging.getLogger(__name__)
 
 
+def parse_config(raw_config):
+    logger.info('Parsing config for switch %s in %s' % (raw_config['hostname'], raw_config['datacenter']))
+    return Config.load(obj=raw_config)
+
 def run_step(root_path, state):
     state['parsed_configs'] = []
     for raw_config in state['merged_configs']['switches']:
-        logger.info('Parsing config for switch %s in %s' % (raw_config['hostname'], raw_config['datacenter']))
-        parsed = Config.load(obj=raw_config)
-        state['parsed_configs'].append(parsed)
+        with profiling.switch(state, (raw_config['hostname'], raw_config['datacenter'])):
+            state['parsed_configs'].append(parse_config(raw_config))
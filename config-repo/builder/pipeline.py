@@ -0,0 +1,70 @@
+import os
+import shutil
+import functools
+from concurrent.futures import ProcessPoolExecutor
+import logging
+from . import parse, breakout, fixers, topology, frr, config_db, profiling
+logger = logging.getLogger(__name__)
+
+
+def build_switch(root_path, raw_config, frr_path):
+    """
+    Runs parse, breakout, fixers, topology, frr and config_db steps for a single switch.
+    Used by worker processes, so it only depends on its arguments and the resources registry.
+    """
+    config = parse.parse_config(raw_config)
+    interfaces = breakout.generate_interfaces(root_path, config)
+    fixers.set_hwsku(config, fixers.load_default_sku_config(root_path))
+    fixers.remove_unused_ports(config, interfaces)
+    switch_topology = topology.build_topology(config)
+    switch = (config.hostname, config.datacenter)
+    rendered = frr.render_config_to_file(frr.create_environment(root_path), config, switch_topology, frr_path / ('.'.join(switch) + '.conf'))
+    switch_config_db = config_db.generate_config_db(root_path, config, interfaces, switch_topology)
+    return config, interfaces, switch_topology, rendered, switch_config_db
+
+
+def build_switch_profiled(root_path, raw_config, frr_path):
+    result, measurement = profiling.measure(build_switch, root_path, raw_config, frr_path)
+    return result, measurement + (os.getpid(),)
+
+
+def run_step(root_path, state):
+    frr_path = root_path / "_build/frr"
+    config_db_path = root_path / "_build/config_db"
+    for gen_path in [frr_path, config_db_path]:
+        if gen_path.exists():
+            shutil.rmtree(gen_path)
+        gen_path.mkdir(parents=True)
+
+    state['parsed_configs'] = []
+    state['interfaces'] = {}
+    state['topology'] = {}
+    state['frr'] = {}
+    state['config_db'] = {}
+    state['config_db_files'] = {}
+    state['manifests'] = {}
+
+    frr.precompile_templates(frr.create_environment(root_path))
+    raw_configs = state['merged_configs']['switches']
+    jobs = state.get('jobs', 1)
+    logger.info('Building %s switches using %s processes' % (len(raw_configs), jobs))
+    profiler = state.get('profiler')
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        # map() returns results in submission order, so the output does not depend on scheduling
+        if profiler is None:
+            results = executor.map(functools.partial(build_switch, root_path, frr_path=frr_path), raw_configs)
+        else:
+            results = executor.map(functools.partial(build_switch_profiled, root_path, frr_path=frr_path), raw_configs)
+        for result in results:
+            if profiler is not None:
+                result, (start, wall, cpu, peak, pid) = result
+            config, interfaces, switch_topology, rendered, switch_config_db = result
+            switch = (config.hostname, config.datacenter)
+            if profiler is not None:
+                profiler.record('%s/%s' % (switch[1], switch[0]), 'switch', start, wall, cpu, peak, pid)
+            state['parsed_configs'].append(config)
+            state['interfaces'][switch] = interfaces
+            state['topology'][switch] = switch_topology
+            state['frr'][switch] = rendered
+            state['config_db'][switch] = switch_config_db
+            state['config_db_files'][switch], state['manifests'][switch] = config_db.save_config_db(config_db_path, switch, switch_config_db, rendered)
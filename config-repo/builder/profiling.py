@@ -0,0 +1,162 @@
+import os
+import io
+import json
+import time
+import pstats
+import cProfile
+import tracemalloc
+import contextlib
+from dataclasses import dataclass, asdict
+from typing import Optional
+import logging
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Span:
+    name: str
+    category: str # step or switch
+    step: Optional[str]
+    start: float
+    wall: float
+    cpu: float
+    peak_memory: Optional[int]
+    pid: int
+
+
+def measure(func, *args, **kwargs):
+    """
+    Calls func and returns its result together with (start, wall, cpu, peak memory) measured in
+    the calling process. Used by worker processes which can not reach the profiler.
+    """
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    start, cpu_start = time.perf_counter(), time.process_time()
+    result = func(*args, **kwargs)
+    wall, cpu = time.perf_counter() - start, time.process_time() - cpu_start
+    return result, (start, wall, cpu, tracemalloc.get_traced_memory()[1] - base)
+
+
+class Profiler:
+    """
+    Records wall time, CPU time and peak traced memory of build steps and of every switch
+    within a step. Spans may nest, peak memory of a nested span is propagated to its parent.
+    """
+
+    def __init__(self, cprofile_step=None):
+        self.cprofile_step = cprofile_step
+        self.spans = []
+        self.cprofile_stats = None
+        self._stack = []
+        self._step = None
+        self._executed = []
+        tracemalloc.start()
+
+    def record(self, name, category, start, wall, cpu, peak_memory, pid=None):
+        self.spans.append(Span(name, category, self._step, start, wall, cpu, peak_memory, pid or os.getpid()))
+
+    @contextlib.contextmanager
+    def span(self, name, category):
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        self._stack.append(0)
+        start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - start, time.process_time() - cpu_start
+            peak = max(tracemalloc.get_traced_memory()[1], self._stack.pop())
+            if self._stack:
+                self._stack[-1] = max(self._stack[-1], peak)
+            tracemalloc.reset_peak()
+            self.record(name, category, start, wall, cpu, peak - base)
+
+    @contextlib.contextmanager
+    def step(self, step):
+        self._step = step['name']
+        module = step['method'].__module__.split('.')[-1]
+        self._executed.append('%s (%s)' % (step['name'], module))
+        profiler = cProfile.Profile() if self.cprofile_step in [step['name'], module] else None
+        try:
+            with self.span(step['name'], 'step'):
+                if profiler is None:
+                    yield
+                else:
+                    with profiler:
+                        yield
+        finally:
+            self._step = None
+            if profiler is not None:
+                out = io.StringIO()
+                pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(40)
+                self.cprofile_stats = (step['name'], profiler, out.getvalue())
+
+    def trace_events(self):
+        origin = min((span.start for span in self.spans), default=0)
+        events = []
+        for span in self.spans:
+            events.append({
+                'name': span.name if span.category == 'step' else '%s (%s)' % (span.name, span.step),
+                'cat': span.category,
+                'ph': 'X',
+                'ts': round((span.start - origin) * 1e6),
+                'dur': round(span.wall * 1e6),
+                'pid': span.pid,
+                'tid': span.pid,
+                'args': {'cpu_ms': round(span.cpu * 1e3, 3), 'peak_memory': span.peak_memory},
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def switch_totals(self):
+        totals = {}
+        for span in self.spans:
+            if span.category == 'switch':
+                total = totals.setdefault(span.name, {'wall': 0.0, 'cpu': 0.0, 'peak_memory': 0})
+                total['wall'] += span.wall
+                total['cpu'] += span.cpu
+                total['peak_memory'] = max(total['peak_memory'], span.peak_memory or 0)
+        return totals
+
+    def write(self, path):
+        path.mkdir(parents=True, exist_ok=True)
+        report = {
+            'steps': [asdict(span) for span in self.spans if span.category == 'step'],
+            'switches': [asdict(span) for span in self.spans if span.category == 'switch'],
+            'switch_totals': self.switch_totals(),
+        }
+        (path / 'report.json').write_text(json.dumps(report, indent=4))
+        (path / 'trace.json').write_text(json.dumps(self.trace_events()))
+        if self.cprofile_stats is not None:
+            _, profiler, text = self.cprofile_stats
+            profiler.dump_stats(str(path / 'cprofile.prof'))
+            (path / 'cprofile.txt').write_text(text)
+        elif self.cprofile_step is not None:
+            # e.g. frr with -j or --stream, per switch steps run inside the pipeline or stream step
+            logger.warning('Profiled step %s did not match any executed step, no cProfile was captured. Executed steps: %s'
+                           % (self.cprofile_step, ', '.join(self._executed)))
+        logger.info('Profile written to %s' % path)
+
+    def summary(self, top=10):
+        lines = ['%-40s %9s %9s %11s' % ('STEP', 'WALL [s]', 'CPU [s]', 'PEAK [KiB]')]
+        for span in self.spans:
+            if span.category == 'step':
+                lines.append('%-40s %9.3f %9.3f %11d' % (span.name, span.wall, span.cpu, (span.peak_memory or 0) // 1024))
+        totals = sorted(self.switch_totals().items(), key=lambda item: item[1]['wall'], reverse=True)
+        if totals:
+            lines.append('')
+            lines.append('%-40s %9s %9s %11s' % ('SLOWEST SWITCHES', 'WALL [s]', 'CPU [s]', 'PEAK [KiB]'))
+            for name, total in totals[:top]:
+                lines.append('%-40s %9.3f %9.3f %11d' % (name, total['wall'], total['cpu'], total['peak_memory'] // 1024))
+        return '\n'.join(lines)
+
+
+def switch(state, switch):
+    """
+    Context manager timing work done for one switch (hostname, datacenter) when profiling is enabled.
+    """
+    profiler = state.get('profiler')
+    if profiler is None:
+        return contextlib.nullcontext()
+    return profiler.span('%s/%s' % (switch[1], switch[0]), 'switch')
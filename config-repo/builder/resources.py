@@ -0,0 +1,99 @@
+import json
+import hashlib
+import functools
+from types import MappingProxyType
+import logging
+import jinja2
+from jinja2.bccache import Bucket
+from .breakout_utils import BreakoutIndex
+from .cache import CACHE_DIR
+logger = logging.getLogger(__name__)
+
+
+def freeze(obj):
+    """
+    Returns read-only copy of parsed JSON, dicts are exposed as mappingproxy and lists as tuples.
+    Shared resources are handed out frozen, so per switch code has to copy what it wants to modify.
+    """
+    if isinstance(obj, dict):
+        return MappingProxyType({key: freeze(val) for key, val in obj.items()})
+    if isinstance(obj, list):
+        return tuple(freeze(x) for x in obj)
+    return obj
+
+
+class TemplateBytecodeCache(jinja2.FileSystemBytecodeCache):
+    """
+    On disk cache of compiled templates keyed by template name and content hash,
+    so an edited template is compiled again and an unchanged one never is.
+    """
+
+    def get_bucket(self, environment, name, filename, source):
+        key = hashlib.sha256(('%s\0%s' % (name, source)).encode('utf-8')).hexdigest()
+        bucket = Bucket(environment, key, self.get_source_checksum(source))
+        self.load_bytecode(bucket)
+        return bucket
+
+
+class Resources:
+    """
+    Registry of static files used by the build: platform definitions, default SKUs, default
+    features and FRR templates. Every resource is loaded lazily and only once.
+    """
+
+    def __init__(self, root_path):
+        self.root_path = root_path
+        self._platforms = {}
+        self._breakout_indexes = {}
+        self._default_sku = None
+        self._default_features = None
+        self._frr_environment = None
+
+    def platform(self, platform):
+        if platform not in self._platforms:
+            logger.debug('Loading platform %s' % platform)
+            path = self.root_path / 'config' / 'platforms' / (platform + '.json')
+            self._platforms[platform] = freeze(json.loads(path.read_text()))
+        return self._platforms[platform]
+
+    def platform_interfaces(self, platform):
+        return self.platform(platform)['interfaces']
+
+    def breakout_index(self, platform):
+        if platform not in self._breakout_indexes:
+            self._breakout_indexes[platform] = BreakoutIndex(self.platform_interfaces(platform))
+        return self._breakout_indexes[platform]
+
+    def default_sku(self):
+        if self._default_sku is None:
+            raw = (self.root_path / 'config' / 'platforms' / 'default_sku.csv').read_text()
+            self._default_sku = MappingProxyType({line.split(',')[1]: line.split(',')[0] for line in raw.split('\n') if len(line) > 0})
+        return self._default_sku
+
+    def default_features(self):
+        if self._default_features is None:
+            path = self.root_path / 'config' / 'default_features.json'
+            self._default_features = freeze(json.loads(path.read_text()))
+        return self._default_features
+
+    def frr_environment(self):
+        if self._frr_environment is None:
+            cache_path = self.root_path / CACHE_DIR / 'jinja'
+            cache_path.mkdir(parents=True, exist_ok=True)
+            env = jinja2.Environment(
+                loader=jinja2.FileSystemLoader(str(self.root_path / 'templates')),
+                bytecode_cache=TemplateBytecodeCache(str(cache_path))
+            )
+            env.globals['enumerate'] = enumerate
+            env.globals['len'] = len
+            self._frr_environment = env
+        return self._frr_environment
+
+
+@functools.lru_cache(maxsize=None)
+def get(root_path):
+    return Resources(root_path)
+
+
+def reset():
+    get.cache_clear()
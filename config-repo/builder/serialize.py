@@ -0,0 +1,28 @@
+import json
+import hashlib
+
+
+def dumps(obj):
+    """
+    Canonical form of generated JSON files: keys sorted, 4 spaces indent.
+    The same data always gives the same bytes, no matter in which order it was generated.
+    """
+    return json.dumps(obj, indent=4, sort_keys=True)
+
+
+def dumps_compact(obj):
+    """
+    Compact canonical form used for hashing.
+    """
+    return json.dumps(obj, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def digest(obj):
+    return hashlib.sha256(dumps_compact(obj)).hexdigest()
+
+
+def manifest(config_db, frr_digest):
+    return {
+        'config_db': {table: digest(entries) for table, entries in config_db.items()},
+        'frr.conf': frr_digest
+    }
@@ -0,0 +1,90 @@
+import os
+import shutil
+import functools
+import collections
+from concurrent.futures import ProcessPoolExecutor
+import logging
+from . import merge, frr, config_db, export, pipeline, profiling
+logger = logging.getLogger(__name__)
+
+
+def build_switch(root_path, raw_config, frr_path, config_db_path):
+    """
+    Builds a single switch and saves its config_db, returns parsed config and artifacts for export.
+    Nothing else is returned, so intermediate data of the switch can be released right away.
+    """
+    config, _, _, rendered, switch_config_db = pipeline.build_switch(root_path, raw_config, frr_path)
+    switch = (config.hostname, config.datacenter)
+    config_db_file, manifest_file = config_db.save_config_db(config_db_path, switch, switch_config_db, rendered)
+    return config, {'config_db.json': config_db_file, 'frr.conf': rendered, 'manifest.json': manifest_file}
+
+
+def build_switch_profiled(root_path, raw_config, frr_path, config_db_path):
+    result, measurement = profiling.measure(build_switch, root_path, raw_config, frr_path, config_db_path)
+    return result, measurement + (os.getpid(),)
+
+
+def imap_bounded(executor, func, iterable, window):
+    """
+    Like executor.map, but keeps at most window tasks in flight, so the iterable is consumed
+    only as fast as results are taken. Results are returned in submission order.
+    """
+    pending = collections.deque()
+    for item in iterable:
+        pending.append(executor.submit(func, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def run_step(root_path, state):
+    """
+    Streams every switch through merge, parse, breakout, fixers, topology, FRR, config_db and export
+    one at a time, so only shared data (DC configs, resources) stays in memory for the whole build.
+    """
+    frr_path = root_path / "_build/frr"
+    config_db_path = root_path / "_build/config_db"
+    for gen_path in [frr_path, config_db_path]:
+        if gen_path.exists():
+            shutil.rmtree(gen_path)
+        gen_path.mkdir(parents=True)
+    (root_path / "dist").mkdir(parents=True, exist_ok=True)
+    frr.precompile_templates(frr.create_environment(root_path))
+
+    state['streaming'] = True
+    cache = state.get('cache')
+    profiler = state.get('profiler')
+    jobs = state.get('jobs', 1)
+    exported = []
+
+    def export_built(config, artifacts):
+        switch = (config.hostname, config.datacenter)
+        if cache is not None:
+            cache.store(config, artifacts)
+        export.export_switch(root_path, state, switch, config.mac, artifacts)
+        exported.append((switch, config.mac))
+
+    raw_configs = merge.merge_switches(root_path, state)
+    if jobs > 1:
+        func = functools.partial(build_switch if profiler is None else build_switch_profiled, root_path, frr_path=frr_path, config_db_path=config_db_path)
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            for result in imap_bounded(executor, func, raw_configs, 2 * jobs):
+                if profiler is not None:
+                    result, (start, wall, cpu, peak, pid) = result
+                config, artifacts = result
+                if profiler is not None:
+                    profiler.record('%s/%s' % (config.datacenter, config.hostname), 'switch', start, wall, cpu, peak, pid)
+                export_built(config, artifacts)
+    else:
+        for raw_config in raw_configs:
+            with profiling.switch(state, (raw_config['hostname'], raw_config['datacenter'])):
+                config, artifacts = build_switch(root_path, raw_config, frr_path, config_db_path)
+            export_built(config, artifacts)
+
+    for entry in state['cached']:
+        switch = (entry.hostname, entry.datacenter)
+        export.export_switch(root_path, state, switch, entry.mac, entry.artifacts())
+        exported.append((switch, entry.mac))
+    logger.info('Built %s and exported %s switches' % (len(exported) - len(state['cached']), len(exported)))
+    export.finish(root_path, state, exported)
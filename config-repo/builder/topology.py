@@ -0,0 +1,72 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Set, Tuple
+import logging
+from .models.port import PortList, PortChannelConfig
+from .models.vlan import RoutedVlan
+from . import profiling
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class VlanMembers:
+    tagged_ports: PortList = field(default_factory=PortList)
+    tagged_portchannels: PortList = field(default_factory=PortList)
+    untagged_ports: PortList = field(default_factory=PortList)
+    untagged_portchannels: PortList = field(default_factory=PortList)
+
+
+@dataclass
+class Topology:
+    """
+    Relations between ports, port groups, portchannels, VLANs and VRFs of a single switch,
+    resolved once after fixers and shared by config_db generators and the FRR template.
+    """
+    portchannels: Dict[int, PortChannelConfig] = field(default_factory=dict)
+    port_group_ports: Dict[str, PortList] = field(default_factory=dict)
+    vlan_members: Dict[int, VlanMembers] = field(default_factory=dict)
+    vrfs: Set[int] = field(default_factory=set)
+    vrf_routed_vlans: Dict[int, List[Tuple[int, RoutedVlan]]] = field(default_factory=dict)
+    routed_vlan_ports: Dict[int, PortList] = field(default_factory=dict)
+
+
+def build_topology(config):
+    logger.debug("Building topology index for %s in %s" % (config.hostname, config.datacenter))
+    topology = Topology()
+    for portchannel in config.portchannels:
+        topology.portchannels[portchannel.id] = portchannel
+
+    for name, port_group in config.port_groups.items():
+        ports = port_group.ports
+        for portchannel_id in port_group.portchannels:
+            if portchannel_id not in topology.portchannels:
+                raise Exception('Port group %s uses not defined portchannel %s' % (name, portchannel_id))
+            ports = ports + topology.portchannels[portchannel_id].ports
+        topology.port_group_ports[name] = ports
+
+    for vlanid, vlan in config.switched_vlans.items():
+        members = VlanMembers(vlan.tagged_ports, vlan.tagged_portchannels, vlan.untagged_ports, vlan.untagged_portchannels)
+        for port_group in vlan.tagged_port_groups:
+            members.tagged_ports = members.tagged_ports + config.port_groups[port_group].ports
+            members.tagged_portchannels = members.tagged_portchannels + config.port_groups[port_group].portchannels
+        for port_group in vlan.untagged_port_groups:
+            members.untagged_ports = members.untagged_ports + config.port_groups[port_group].ports
+            members.untagged_portchannels = members.untagged_portchannels + config.port_groups[port_group].portchannels
+        topology.vlan_members[vlanid] = members
+        topology.vrfs.add(vlan.vrfid)
+
+    for vlanid, vlan in config.routed_vlans.items():
+        topology.vrfs.add(vlan.vrfid)
+        topology.vrf_routed_vlans.setdefault(vlan.vrfid, []).append((vlanid, vlan))
+        ports = PortList()
+        for port_group in vlan.port_groups:
+            ports = ports + config.port_groups[port_group].ports
+        topology.routed_vlan_ports[vlanid] = ports
+    return topology
+
+
+def run_step(root_path, state):
+    state['topology'] = {}
+    for config in state['parsed_configs']:
+        switch = (config.hostname, config.datacenter)
+        with profiling.switch(state, switch):
+            state['topology'][switch] = build_topology(config)
@@ -0,0 +1,222 @@
+import sys
+import yaml
+from dataclasses import dataclass
+from typing import Optional, Tuple
+from dacite.exceptions import DaciteError
+import logging
+from . import merge, parse, documents, resources, impact
+from .merge import MergedView
+from .breakout_utils import PORT_STR
+from .models.port import PortList
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Violation:
+    switch: Optional[Tuple[str, str]]
+    message: str
+    source: Optional[str] = None
+    line: Optional[int] = None
+
+    def __str__(self):
+        location = '%s:%s' % (self.source, self.line) if self.line is not None else (self.source or '-')
+        if self.switch is None:
+            return '%s: %s' % (location, self.message)
+        return '%s: %s in %s: %s' % (location, self.switch[0], self.switch[1], self.message)
+
+
+def locate_line(root_path, source, keys):
+    """
+    Returns line (1-based) of the deepest node on the path of keys in YAML file source,
+    using marks of the composed node tree. The file is composed only when a violation is reported.
+    """
+    node = yaml.compose((root_path / source).read_text(), Loader=documents.Loader)
+    line = None
+    for key in keys:
+        if isinstance(node, yaml.MappingNode):
+            children = [val for key_node, val in node.value if key_node.value == str(key)]
+        elif isinstance(node, yaml.SequenceNode) and isinstance(key, int) and key < len(node.value):
+            children = [node.value[key]]
+        else:
+            children = []
+        if not children:
+            break
+        node = children[0]
+        line = node.start_mark.line + 1
+    return line
+
+
+def locate(root_path, raw_config, keys):
+    """
+    Returns (source file, line) the value at path keys of merged switch config comes from.
+    """
+    source = None
+    node = raw_config
+    for key in keys:
+        if isinstance(node, MergedView):
+            if key not in node:
+                break
+            source = node.origin(key)[-1]
+        elif isinstance(node, dict) and key in node or isinstance(node, list) and isinstance(key, int) and key < len(node):
+            pass
+        else:
+            break
+        node = node[key]
+    if source is None or source == 'builder':
+        return source, None
+    return source, locate_line(root_path, source, keys)
+
+
+def check_switch(root_path, config):
+    """
+    Returns list of (keys, message) pairs for problems of a single parsed switch config.
+    keys is the path of the offending value in the merged config.
+    """
+    problems = []
+    try:
+        platform_interfaces = resources.get(root_path).platform_interfaces(config.platform)
+        index = resources.get(root_path).breakout_index(config.platform)
+    except (OSError, ValueError) as e:
+        problems.append((('platform',), 'platform %s can not be loaded: %s' % (config.platform, e)))
+        platform_interfaces, index = {}, None
+
+    # Breakouts: modes are matched by BreakoutCfg the same way as in the build, every lane is assigned once
+    lane_owners = {}
+    existing_ports = set()
+    for position, breakout in enumerate(config.breakouts):
+        conflicts = {}
+        failures = {}
+        for port_id in breakout.ports:
+            name = PORT_STR + str(port_id)
+            if name not in platform_interfaces:
+                continue
+            try:
+                interfaces = index.get_config(name, breakout.mode)
+            except RuntimeError as e:
+                failures.setdefault(str(e), []).append(port_id)
+                continue
+            lanes = [lane for properties in interfaces.values() for lane in properties['lanes'].split(',')]
+            owners = {lane_owners[lane] for lane in lanes if lane in lane_owners}
+            for owner in sorted(owners):
+                conflicts.setdefault(owner, []).append(port_id)
+            if owners:
+                continue
+            lane_owners.update((lane, (port_id, breakout.mode)) for lane in lanes)
+            existing_ports.update(interfaces.keys())
+        for message, ports in failures.items():
+            problems.append((('breakouts', position, 'mode'), 'breakout %s of ports %s is not possible: %s' % (breakout.mode, PortList(ports), message)))
+        for (owner, mode), ports in conflicts.items():
+            problems.append((('breakouts', position, 'ports'), 'lanes of ports %s (breakout %s) are already used by port %s (breakout %s)' % (PortList(ports), breakout.mode, owner, mode)))
+
+    # Port groups: ports are in at most one group and portchannels are defined
+    portchannels = {portchannel.id for portchannel in config.portchannels}
+    group_by_port = {}
+    for name, port_group in config.port_groups.items():
+        conflicts = {}
+        for port_id in port_group.ports:
+            if port_id not in existing_ports:
+                continue
+            if port_id in group_by_port:
+                conflicts.setdefault(group_by_port[port_id], []).append(port_id)
+            else:
+                group_by_port[port_id] = name
+        for other, ports in conflicts.items():
+            problems.append((('port_groups', name, 'ports'), 'ports %s are in port groups %s and %s' % (PortList(ports), other, name)))
+        for portchannel_id in port_group.portchannels:
+            if portchannel_id not in portchannels:
+                problems.append((('port_groups', name, 'portchannels'), 'port group %s uses not defined portchannel %s' % (name, portchannel_id)))
+
+    # References from VLANs and BGP to port groups and portchannels
+    vrfs = set()
+    for vlanid, vlan in config.switched_vlans.items():
+        vrfs.add(vlan.vrfid)
+        for attr in ['tagged_port_groups', 'untagged_port_groups']:
+            for name in getattr(vlan, attr):
+                if name not in config.port_groups:
+                    problems.append((('switched_vlans', vlanid, attr), 'VLAN %s uses unknown port group %s' % (vlanid, name)))
+        for attr in ['tagged_portchannels', 'untagged_portchannels']:
+            for portchannel_id in getattr(vlan, attr):
+                if portchannel_id not in portchannels:
+                    problems.append((('switched_vlans', vlanid, attr), 'VLAN %s uses not defined portchannel %s' % (vlanid, portchannel_id)))
+    for vlanid, vlan in config.routed_vlans.items():
+        vrfs.add(vlan.vrfid)
+        for name in vlan.port_groups:
+            if name not in config.port_groups:
+                problems.append((('routed_vlans', vlanid, 'port_groups'), 'routed VLAN %s uses unknown port group %s' % (vlanid, name)))
+    for bgp_name, bgp in config.bgp.items():
+        for peer_group_name, peer_group in bgp.peer_groups.items():
+            for name in peer_group.unnumbered_bgp_port_groups:
+                if name not in config.port_groups:
+                    problems.append((('bgp', bgp_name, 'peer_groups', peer_group_name, 'unnumbered_bgp_port_groups'), 'peer group %s uses unknown port group %s' % (peer_group_name, name)))
+
+    # Static routes are generated only into VRFs created by VLANs
+    for position, route in enumerate(config.static_routes):
+        if route.vrfid not in vrfs:
+            problems.append((('static_routes', position, 'vrfid'), 'static route to %s uses VRF %s which is not created by any VLAN' % (route.prefix, route.vrfid)))
+    return problems
+
+
+def load_documents(root_path):
+    """
+    Parses every config file, returns set of switches whose files are all valid YAML (None when
+    global.yaml is not) and list of Violations for the other files. Parsed documents stay cached,
+    merging does not parse them again.
+    """
+    violations = []
+    broken = set()
+    config_path = root_path / 'config'
+    paths = [config_path / 'global.yaml'] + sorted((config_path / 'dc').glob('*.yaml')) + sorted((config_path / 'switches').glob('*/*.yaml'))
+    for path in paths:
+        source = str(path.relative_to(root_path))
+        try:
+            documents.load(root_path, path)
+        except yaml.YAMLError as e:
+            mark = getattr(e, 'problem_mark', None) or getattr(e, 'context_mark', None)
+            message = getattr(e, 'problem', None) or str(e)
+            violations.append(Violation(None, 'invalid YAML: %s' % message, source, mark.line + 1 if mark is not None else None))
+            broken.add(source)
+    if 'config/global.yaml' in broken:
+        return None, violations
+    switches = {
+        (hostname, dc) for hostname, dc in impact.list_switches(root_path)
+        if 'config/dc/%s.yaml' % dc not in broken and 'config/switches/%s/%s.yaml' % (dc, hostname) not in broken
+    }
+    return switches, violations
+
+
+def validate(root_path):
+    """
+    Merges and parses every switch and returns list of Violations found by per switch and fleet-wide checks.
+    Switches with invalid YAML files are reported and skipped.
+    """
+    selected, violations = load_documents(root_path)
+    if selected is None:
+        return violations
+    state = {'cache': None, 'selected': selected}
+    by_mac = {}
+    for raw_config in merge.merge_switches(root_path, state):
+        switch = (raw_config['hostname'], raw_config['datacenter'])
+        try:
+            config = parse.parse_config(raw_config)
+        except (DaciteError, ValueError) as e:
+            violations.append(Violation(switch, 'invalid config: %s' % e, 'config/switches/%s/%s.yaml' % (switch[1], switch[0])))
+            continue
+        for keys, message in check_switch(root_path, config):
+            violations.append(Violation(switch, message, *locate(root_path, raw_config, keys)))
+        by_mac.setdefault(config.mac.lower(), []).append((switch, raw_config))
+
+    for mac, switches in by_mac.items():
+        if len(switches) < 2:
+            continue
+        names = ', '.join('%s in %s' % switch for switch, _ in switches)
+        for switch, raw_config in switches:
+            violations.append(Violation(switch, 'MAC %s is used by %s' % (mac, names), *locate(root_path, raw_config, ('mac',))))
+    return violations
+
+
+def run_validate(root_path):
+    violations = validate(root_path)
+    for violation in violations:
+        print(violation, file=sys.stderr)
+    logger.info('Validation found %s problems' % len(violations))
+    return len(violations) > 0
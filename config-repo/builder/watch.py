@@ -0,0 +1,70 @@
+import time
+from pathlib import Path
+import logging
+from . import impact, resources
+logger = logging.getLogger(__name__)
+
+WATCHED_DIRS = ['config', 'templates']
+CODE_PATHS = ['build', 'builder']
+
+# Changes of these files invalidate loaded resources
+RESOURCE_PREFIXES = ['config/platforms/', 'config/default_features.json', 'templates/']
+
+
+def snapshot(root_path):
+    """
+    Returns dict mapping paths relative to root_path to their modification time for
+    every watched file and builder source.
+    """
+    paths = []
+    for name in WATCHED_DIRS:
+        paths += [path for path in (root_path / name).glob('**/*') if path.is_file()]
+    paths += [root_path / 'build'] + list((root_path / 'builder').glob('**/*.py'))
+    mtimes = {}
+    for path in paths:
+        try:
+            mtimes[str(path.relative_to(root_path))] = path.stat().st_mtime_ns
+        except OSError:
+            pass
+    return mtimes
+
+
+def changed_files(old, new):
+    return sorted(path for path in old.keys() | new.keys() if old.get(path) != new.get(path))
+
+
+def run_watch(root_path, build, interval=0.5):
+    """
+    Builds every switch and then polls watched files, rebuilding only switches affected by
+    each change. build is called with the set of selected switches (None for all) and returns
+    True on error. Resources stay loaded between builds and are reset when their files change.
+    """
+    mtimes = snapshot(root_path)
+    build(None)
+    logger.info('Watching %s for changes' % ', '.join(WATCHED_DIRS))
+    while True:
+        time.sleep(interval)
+        new_mtimes = snapshot(root_path)
+        changed = changed_files(mtimes, new_mtimes)
+        mtimes = new_mtimes
+        if not changed:
+            continue
+        logger.info('Changed: %s' % ', '.join(changed))
+
+        if any(Path(path).parts[0] in CODE_PATHS for path in changed):
+            logger.warning('Builder code has changed, restart the build to use it')
+            changed = [path for path in changed if Path(path).parts[0] not in CODE_PATHS]
+        if any(path.startswith(prefix) for path in changed for prefix in RESOURCE_PREFIXES):
+            resources.reset()
+
+        removed = [path for path in changed if path not in new_mtimes and path.startswith('config/')]
+        if removed:
+            # Stale dist entries are removed only by a full build, the rest comes from the build cache
+            selected = None
+        else:
+            selected = impact.affected_switches(root_path, changed)
+            if not selected:
+                continue
+        start = time.monotonic()
+        error = build(selected)
+        logger.info('Rebuilt %s switches in %.2fs%s' % ('all' if selected is None else len(selected), time.monotonic() - start, ' with errors' if error else ''))
@@ -0,0 +1,122 @@
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+# Tables in dependency order, entries are added in this order and removed in the reverse one
+TABLE_ORDER = [
+    'DEVICE_METADATA',
+    'FEATURE',
+    'NTP_SERVER',
+    'BREAKOUT_CFG',
+    'PORT',
+    'VRF',
+    'PORTCHANNEL',
+    'PORTCHANNEL_MEMBER',
+    'VLAN',
+    'VLAN_MEMBER',
+    'VLAN_INTERFACE',
+    'VLAN_SUB_INTERFACE',
+    'STATIC_ROUTE',
+]
+
+# Changes in these tables can not be applied entry by entry and need a full reload
+RELOAD_TABLES = {'DEVICE_METADATA', 'BREAKOUT_CFG'}
+
+
+@dataclass
+class TableDelta:
+    table: str
+    added: Dict[str, dict] = field(default_factory=dict)
+    removed: List[str] = field(default_factory=list)
+    modified: Dict[str, dict] = field(default_factory=dict)
+
+
+class InMemoryConfigDB:
+    """
+    Stand-in for swsscommon ConfigDBConnector used for dry runs and tests, keeps CONFIG_DB
+    as a dict of tables and records every write.
+    """
+
+    def __init__(self, data=None):
+        self.data = {table: dict(entries) for table, entries in (data or {}).items()}
+        self.writes = []
+
+    def set_entry(self, table, key, data):
+        self.writes.append((table, key, data))
+        if data is None:
+            self.data.get(table, {}).pop(key, None)
+            if table in self.data and len(self.data[table]) == 0:
+                del self.data[table]
+        else:
+            self.data.setdefault(table, {})[key] = dict(data)
+
+    def get_config(self):
+        return self.data
+
+
+def table_rank(table):
+    if table in TABLE_ORDER:
+        return (TABLE_ORDER.index(table), table)
+    return (len(TABLE_ORDER), table)
+
+
+def key_rank(key):
+    # "Vlan10" has to exist before "Vlan10|10.0.0.1/24"
+    return (key.count('|'), key)
+
+
+def compute_delta(old, new):
+    """
+    Returns list of TableDelta with keys added, removed and modified between two
+    config_db dicts, ordered by table dependencies. Unchanged tables are skipped.
+    """
+    deltas = []
+    for table in sorted(set(old) | set(new), key=table_rank):
+        old_entries = old.get(table, {})
+        new_entries = new.get(table, {})
+        if old_entries == new_entries:
+            continue
+        delta = TableDelta(table)
+        for key in sorted(new_entries, key=key_rank):
+            if key not in old_entries:
+                delta.added[key] = new_entries[key]
+            elif old_entries[key] != new_entries[key]:
+                delta.modified[key] = new_entries[key]
+        delta.removed = sorted((key for key in old_entries if key not in new_entries), key=key_rank, reverse=True)
+        deltas.append(delta)
+    return deltas
+
+
+def requires_reload(deltas):
+    return any(delta.table in RELOAD_TABLES for delta in deltas)
+
+
+def delta_operations(deltas):
+    """
+    Orders changes as (table, key, data) writes, data None means removal. Removals go
+    first in reverse dependency order, so members disappear before the objects they use.
+    """
+    operations = []
+    for delta in reversed(deltas):
+        for key in delta.removed:
+            operations.append((delta.table, key, None))
+    for delta in deltas:
+        for key, data in delta.added.items():
+            operations.append((delta.table, key, data))
+        for key, data in delta.modified.items():
+            operations.append((delta.table, key, data))
+    return operations
+
+
+def apply_delta(connector, deltas, log=print):
+    """
+    Applies deltas through ConfigDBConnector-like object with set_entry(table, key, data).
+    Modified entries are written as whole hashes, so removed fields disappear too.
+    """
+    operations = delta_operations(deltas)
+    for table, key, data in operations:
+        if data is None:
+            log('DEL %s|%s' % (table, key))
+        else:
+            log('SET %s|%s %s' % (table, key, data))
+        connector.set_entry(table, key, data)
+    return operations
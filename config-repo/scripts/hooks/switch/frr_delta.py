@@ -0,0 +1,179 @@
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+# The same rules as prettify_frr_lines in the builder use to indent blocks
+BLOCK_TAGS = ['router', 'address-family', 'route-map']
+EXIT_TAG = 'exit'
+
+# Lines which can not be changed in running daemons, changing them requires restart
+RESTART_TAGS = ['frr defaults']
+
+# Settings holding a single value, setting a new value replaces the old one without "no"
+SINGLE_VALUE_SETTINGS = [re.compile(pattern) for pattern in [
+    r'^(bgp router-id) ',
+    r'^(neighbor \S+ remote-as) ',
+    r'^(neighbor \S+ description) ',
+    r'^(log facility) ',
+    r'^(log syslog) ',
+    r'^(match tag) ',
+    r'^(set \S+) ',
+]]
+
+# Lines defining a peer group or a neighbor (as a member of a peer group)
+NEIGHBOR_DEFINITION = re.compile(r'^neighbor (\S+) (?:interface )?peer-group(?: \S+)?$')
+NEIGHBOR_LINE = re.compile(r'^neighbor (\S+) ')
+
+
+@dataclass
+class Block:
+    header: Optional[str] = None
+    footer: Optional[str] = None
+    children: Dict[str, Optional['Block']] = field(default_factory=dict)
+
+
+@dataclass
+class FrrDelta:
+    commands: List[str] = field(default_factory=list)
+    requires_restart: bool = False
+
+
+def parse_config(text):
+    """
+    Parses rendered frr.conf into a tree of blocks. Leaf lines are stored as keys
+    mapped to None, nested blocks as keys mapped to Block. Comments and 'end' are skipped.
+    """
+    root = Block()
+    stack = [root]
+    for line in text.split('\n'):
+        line = line.strip()
+        if len(line) == 0 or line.startswith('!') or line == 'end':
+            continue
+        if line.startswith(EXIT_TAG) and len(stack) > 1:
+            stack.pop().footer = line
+            continue
+        if any(line.startswith(tag) for tag in BLOCK_TAGS):
+            block = Block(line)
+            stack[-1].children[line] = block
+            stack.append(block)
+        else:
+            stack[-1].children[line] = None
+    return root
+
+
+def negate(line):
+    if line.startswith('no '):
+        return line[3:]
+    return 'no ' + line
+
+
+def setting_key(line):
+    for pattern in SINGLE_VALUE_SETTINGS:
+        match = pattern.match(line)
+        if match:
+            return match.group(1)
+    return line
+
+
+def block_commands(block):
+    commands = [block.header]
+    for line, child in block.children.items():
+        commands += block_commands(child) if child is not None else [line]
+    commands.append(block.footer or EXIT_TAG)
+    return commands
+
+
+def remove_block_commands(block):
+    # address-family can not be removed with "no", its content has to be removed instead
+    if block.header.startswith('address-family'):
+        commands = [block.header]
+        for line, child in reversed(list(block.children.items())):
+            commands += remove_block_commands(child) if child is not None else [negate(line)]
+        commands.append(block.footer or EXIT_TAG)
+        return commands
+    return [negate(block.header)]
+
+
+def defined_neighbor(line):
+    """
+    Returns name of the neighbor or peer group line defines, None for other lines.
+    """
+    match = NEIGHBOR_DEFINITION.match(line)
+    return match.group(1) if match else None
+
+
+def refers_neighbor(line, names):
+    match = NEIGHBOR_LINE.match(line)
+    return match is not None and match.group(1) in names
+
+
+def is_replaced(line, child, other):
+    return line not in other.children or (child is None) != (other.children[line] is None)
+
+
+def wrap(block, commands):
+    return [block.header] + commands + [block.footer or EXIT_TAG]
+
+
+def diff_blocks(old, new, delta, recreated=frozenset()):
+    """
+    Returns (removals, additions) lists of commands. Removals inside nested blocks come before
+    removals on the level of the block, since nested lines may refer to neighbors removed there.
+    Additions on the level of the block come before nested ones for the same reason.
+    Neighbors in recreated were deleted and defined again on a parent level, all their lines are added again.
+    """
+    added_keys = {setting_key(line) for line, child in new.children.items() if child is None and line not in old.children}
+    # Removing the definition of a neighbor deletes it together with all its settings
+    deleted = {defined_neighbor(line) for line, child in old.children.items() if child is None and line not in new.children} - {None}
+    recreated = recreated | {defined_neighbor(line) for line, child in new.children.items() if child is None and line not in old.children and defined_neighbor(line) in deleted}
+
+    removals = []
+    nested_additions = []
+    for line, child in new.children.items():
+        if is_replaced(line, child, old):
+            if any(line.startswith(tag) for tag in RESTART_TAGS):
+                delta.requires_restart = True
+            if child is not None:
+                nested_additions += block_commands(child)
+        elif child is not None and (child != old.children[line] or recreated):
+            nested_removals, additions = diff_blocks(old.children[line], child, delta, recreated)
+            if nested_removals:
+                removals += wrap(child, nested_removals)
+            if additions:
+                nested_additions += wrap(child, additions)
+
+    for line, child in reversed(list(old.children.items())):
+        if not is_replaced(line, child, new):
+            continue
+        if any(line.startswith(tag) for tag in RESTART_TAGS):
+            delta.requires_restart = True
+        if child is not None:
+            removals += remove_block_commands(child)
+        elif setting_key(line) not in added_keys:
+            removals.append(negate(line))
+
+    additions = [
+        line for line, child in new.children.items()
+        if child is None and (line not in old.children or refers_neighbor(line, recreated))
+    ]
+    return removals, additions + nested_additions
+
+
+def compute_delta(old_text, new_text):
+    """
+    Computes ordered vtysh configuration commands moving running FRR from old_text
+    config to new_text. Removed lines are negated with "no" (except those overridden
+    by a new value of the same setting), removed blocks are deleted by their header,
+    changed blocks are entered and diffed recursively. All removals precede additions.
+    """
+    delta = FrrDelta()
+    removals, additions = diff_blocks(parse_config(old_text), parse_config(new_text), delta)
+    delta.commands = removals + additions
+    return delta
+
+
+def vtysh_args(commands):
+    args = ['-c', 'configure terminal']
+    for command in commands:
+        args += ['-c', command]
+    return args
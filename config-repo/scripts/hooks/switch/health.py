@@ -0,0 +1,78 @@
+import time
+from dataclasses import dataclass, field
+from typing import Callable, List
+
+
+def count_established_sessions(data):
+    """
+    Counts BGP sessions in Established state in output of 'show bgp vrf all summary json'.
+    """
+    count = 0
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            for key, val in node.items():
+                if isinstance(val, (dict, list)):
+                    stack.append(val)
+                elif key.endswith('state') and val == 'Established':
+                    count += 1
+        elif isinstance(node, list):
+            stack.extend(node)
+    return count
+
+
+@dataclass
+class Sample:
+    elapsed: float
+    bgp_sessions: int
+    system_health: bool
+    bgp_duration: float
+    health_duration: float
+
+
+@dataclass
+class ConvergenceResult:
+    converged: bool
+    revert: bool
+    bgp_sessions: int
+    system_health: bool
+    elapsed: float
+    samples: List[Sample] = field(default_factory=list)
+    reasons: List[str] = field(default_factory=list)
+
+
+def revert_reasons(bgp_sessions, system_health, bgp_sessions_new, system_health_new):
+    reasons = []
+    if bgp_sessions_new < bgp_sessions * 0.5 and bgp_sessions_new - bgp_sessions < -1:
+        reasons.append('Number of BGP sessions dropped')
+    if system_health and not system_health_new:
+        reasons.append('System health changed to negative')
+    return reasons
+
+
+def wait_for_convergence(bgp_sessions, system_health, get_bgp_sessions: Callable[[], int], get_system_health: Callable[[], bool],
+                         deadline=90, interval=5, clock=time.monotonic, sleep=time.sleep, log=print):
+    """
+    Polls probes until the state from before the update is restored or deadline (in seconds) passes.
+    Changes are reverted only if the state measured at the deadline is still worse than the
+    baseline according to revert_reasons. Probes, clock and sleep are arguments so it can be tested with fakes.
+    """
+    start = clock()
+    samples = []
+    while True:
+        sleep(interval)
+        probe_start = clock()
+        bgp_sessions_new = get_bgp_sessions()
+        probe_bgp_end = clock()
+        system_health_new = get_system_health()
+        probe_health_end = clock()
+        elapsed = probe_health_end - start
+        samples.append(Sample(elapsed, bgp_sessions_new, system_health_new, probe_bgp_end - probe_start, probe_health_end - probe_bgp_end))
+        log('[%5.1fs] BGP sessions: %s/%s, system health: %s' % (elapsed, bgp_sessions_new, bgp_sessions, system_health_new))
+
+        if bgp_sessions_new >= bgp_sessions and (system_health_new or not system_health):
+            return ConvergenceResult(True, False, bgp_sessions_new, system_health_new, elapsed, samples)
+        if elapsed + interval > deadline:
+            reasons = revert_reasons(bgp_sessions, system_health, bgp_sessions_new, system_health_new)
+            return ConvergenceResult(False, len(reasons) > 0, bgp_sessions_new, system_health_new, elapsed, samples, reasons)
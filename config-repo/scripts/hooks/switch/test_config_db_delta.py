@@ -0,0 +1,103 @@
+import unittest
+import config_db_delta
+from config_db_delta import compute_delta, requires_reload, apply_delta, InMemoryConfigDB
+
+OLD = {
+    'DEVICE_METADATA': {'localhost': {'hostname': 'leaf01', 'mac': '00:11:22:33:44:01'}},
+    'PORT': {
+        'Ethernet0': {'admin_status': 'up', 'mtu': '9100'},
+        'Ethernet4': {'admin_status': 'up', 'mtu': '9100'},
+    },
+    'VRF': {'Vrf1': {}},
+    'VLAN': {'Vlan10': {'vlanid': '10'}},
+    'VLAN_MEMBER': {'Vlan10|Ethernet0': {'tagging_mode': 'tagged'}},
+    'VLAN_INTERFACE': {'Vlan10': {'vrf_name': 'Vrf1'}, 'Vlan10|10.0.0.1/24': {}},
+}
+
+
+def changed(old, **tables):
+    new = {table: dict(entries) for table, entries in old.items()}
+    for table, entries in tables.items():
+        if entries is None:
+            del new[table]
+        else:
+            new[table] = entries
+    return new
+
+
+class ConfigDbDeltaTest(unittest.TestCase):
+
+    def apply(self, old, new):
+        connector = InMemoryConfigDB(old)
+        operations = apply_delta(connector, compute_delta(old, new), log=lambda line: None)
+        return connector, operations
+
+    def test_same_config(self):
+        self.assertEqual(compute_delta(OLD, OLD), [])
+        connector, operations = self.apply(OLD, OLD)
+        self.assertEqual(operations, [])
+        self.assertEqual(connector.writes, [])
+
+    def test_added_removed_modified(self):
+        new = changed(OLD, PORT={
+            'Ethernet0': {'admin_status': 'down', 'mtu': '9100'},
+            'Ethernet8': {'admin_status': 'up', 'mtu': '9100'},
+        })
+        deltas = compute_delta(OLD, new)
+        self.assertEqual(len(deltas), 1)
+        self.assertEqual(deltas[0].table, 'PORT')
+        self.assertEqual(deltas[0].added, {'Ethernet8': {'admin_status': 'up', 'mtu': '9100'}})
+        self.assertEqual(deltas[0].modified, {'Ethernet0': {'admin_status': 'down', 'mtu': '9100'}})
+        self.assertEqual(deltas[0].removed, ['Ethernet4'])
+        self.assertFalse(requires_reload(deltas))
+
+    def test_apply_gives_new_config(self):
+        new = changed(
+            OLD,
+            VRF={'Vrf2': {}},
+            VLAN={'Vlan20': {'vlanid': '20'}},
+            VLAN_MEMBER={'Vlan20|Ethernet4': {'tagging_mode': 'untagged'}},
+            VLAN_INTERFACE={'Vlan20': {'vrf_name': 'Vrf2'}, 'Vlan20|10.0.1.1/24': {}},
+        )
+        connector, _ = self.apply(OLD, new)
+        self.assertEqual(connector.get_config(), new)
+
+    def test_removed_table(self):
+        new = changed(OLD, VLAN=None, VLAN_MEMBER=None, VLAN_INTERFACE=None)
+        connector, _ = self.apply(OLD, new)
+        self.assertEqual(connector.get_config(), new)
+
+    def test_operation_order(self):
+        new = changed(
+            OLD,
+            VRF={'Vrf2': {}},
+            VLAN={'Vlan20': {'vlanid': '20'}},
+            VLAN_MEMBER={'Vlan20|Ethernet4': {'tagging_mode': 'untagged'}},
+            VLAN_INTERFACE={'Vlan20': {'vrf_name': 'Vrf2'}, 'Vlan20|10.0.1.1/24': {}},
+        )
+        _, operations = self.apply(OLD, new)
+        keys = [(table, key, data is None) for table, key, data in operations]
+        # Removals first, members and addresses before the objects they belong to
+        self.assertLess(keys.index(('VLAN_INTERFACE', 'Vlan10|10.0.0.1/24', True)), keys.index(('VLAN_INTERFACE', 'Vlan10', True)))
+        self.assertLess(keys.index(('VLAN_MEMBER', 'Vlan10|Ethernet0', True)), keys.index(('VLAN', 'Vlan10', True)))
+        self.assertLess(keys.index(('VLAN_INTERFACE', 'Vlan10', True)), keys.index(('VRF', 'Vrf1', True)))
+        self.assertLess(keys.index(('VRF', 'Vrf1', True)), keys.index(('VRF', 'Vrf2', False)))
+        # Additions in dependency order
+        self.assertLess(keys.index(('VRF', 'Vrf2', False)), keys.index(('VLAN', 'Vlan20', False)))
+        self.assertLess(keys.index(('VLAN', 'Vlan20', False)), keys.index(('VLAN_MEMBER', 'Vlan20|Ethernet4', False)))
+        self.assertLess(keys.index(('VLAN_INTERFACE', 'Vlan20', False)), keys.index(('VLAN_INTERFACE', 'Vlan20|10.0.1.1/24', False)))
+
+    def test_modified_entry_is_written_whole(self):
+        new = changed(OLD, PORT={'Ethernet0': {'admin_status': 'up'}, 'Ethernet4': OLD['PORT']['Ethernet4']})
+        connector, operations = self.apply(OLD, new)
+        self.assertEqual(operations, [('PORT', 'Ethernet0', {'admin_status': 'up'})])
+        self.assertEqual(connector.get_config()['PORT']['Ethernet0'], {'admin_status': 'up'})
+
+    def test_reload_tables(self):
+        for table in config_db_delta.RELOAD_TABLES:
+            new = changed(OLD, **{table: {'localhost': {'changed': 'true'}}})
+            self.assertTrue(requires_reload(compute_delta(OLD, new)), table)
+
+
+if __name__ == '__main__':
+    unittest.main()
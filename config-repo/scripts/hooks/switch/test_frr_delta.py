@@ -0,0 +1,95 @@
+import unittest
+import frr_delta
+
+HEADER = '''log syslog informational
+log facility local4
+frr defaults datacenter
+'''
+
+ROUTE_MAPS = '''ip prefix-list PXL-PG-A-0-IMPORT seq 10 permit 0.0.0.0/0
+route-map RMP-PG-A-IMPORT permit 10
+  match ip address prefix-list PXL-PG-A-0-IMPORT
+exit
+'''
+
+
+def render(neighbors, peer_groups=('PG-A', 'PG-B'), route_maps=ROUTE_MAPS, header=HEADER):
+    """
+    Returns frr.conf in the form produced by the builder, neighbors is list of (address, peer group, description).
+    """
+    lines = ['router bgp 65001 vrf Vrf2', '  bgp router-id 10.0.0.1', '  !']
+    for peer_group in peer_groups:
+        lines += ['  neighbor %s peer-group' % peer_group, '  neighbor %s remote-as external' % peer_group]
+    lines.append('  !')
+    for address, peer_group, description in neighbors:
+        lines += ['  neighbor %s peer-group %s' % (address, peer_group), '  neighbor %s description %s' % (address, description)]
+    lines += ['  !', '  address-family ipv4 unicast']
+    for peer_group in peer_groups:
+        lines += ['    neighbor %s soft-reconfiguration inbound' % peer_group, '    neighbor %s route-map RMP-%s-IMPORT in' % (peer_group, peer_group)]
+    lines += ['  exit-address-family', 'exit', '!']
+    return header + '\n'.join(lines) + '\n' + route_maps + '!\nend\n'
+
+
+class FrrDeltaTest(unittest.TestCase):
+
+    def assertBefore(self, commands, first, second):
+        self.assertIn(first, commands)
+        self.assertIn(second, commands)
+        self.assertLess(commands.index(first), commands.index(second), '%r is not before %r' % (first, second))
+
+    def test_same_config(self):
+        config = render([('10.2.0.1', 'PG-A', 'XXX')])
+        delta = frr_delta.compute_delta(config, config)
+        self.assertEqual(delta.commands, [])
+        self.assertFalse(delta.requires_restart)
+
+    def test_add_neighbor(self):
+        delta = frr_delta.compute_delta(render([]), render([('10.2.0.1', 'PG-A', 'XXX')]))
+        self.assertEqual(delta.commands, [
+            'router bgp 65001 vrf Vrf2',
+            'neighbor 10.2.0.1 peer-group PG-A',
+            'neighbor 10.2.0.1 description XXX',
+            'exit',
+        ])
+
+    def test_change_description(self):
+        delta = frr_delta.compute_delta(render([('10.2.0.1', 'PG-A', 'XXX')]), render([('10.2.0.1', 'PG-A', 'YYY')]))
+        self.assertEqual(delta.commands, ['router bgp 65001 vrf Vrf2', 'neighbor 10.2.0.1 description YYY', 'exit'])
+
+    def test_remove_peer_group(self):
+        delta = frr_delta.compute_delta(render([], peer_groups=['PG-A', 'PG-B']), render([], peer_groups=['PG-B']))
+        commands = delta.commands
+        # Settings in address-family refer to the peer group, so they are removed before it
+        self.assertBefore(commands, 'address-family ipv4 unicast', 'no neighbor PG-A peer-group')
+        self.assertBefore(commands, 'no neighbor PG-A route-map RMP-PG-A-IMPORT in', 'no neighbor PG-A peer-group')
+        self.assertBefore(commands, 'no neighbor PG-A soft-reconfiguration inbound', 'no neighbor PG-A peer-group')
+        self.assertNotIn('neighbor PG-B peer-group', commands)
+
+    def test_add_peer_group(self):
+        delta = frr_delta.compute_delta(render([], peer_groups=['PG-B']), render([], peer_groups=['PG-A', 'PG-B']))
+        self.assertBefore(delta.commands, 'neighbor PG-A peer-group', 'neighbor PG-A soft-reconfiguration inbound')
+        self.assertFalse(any(command.startswith('no ') for command in delta.commands))
+
+    def test_move_neighbor_between_peer_groups(self):
+        delta = frr_delta.compute_delta(render([('10.2.0.1', 'PG-A', 'XXX')]), render([('10.2.0.1', 'PG-B', 'XXX')]))
+        commands = delta.commands
+        self.assertBefore(commands, 'no neighbor 10.2.0.1 peer-group PG-A', 'neighbor 10.2.0.1 peer-group PG-B')
+        # Unbinding deletes the neighbor, its unchanged settings have to be set again
+        self.assertBefore(commands, 'neighbor 10.2.0.1 peer-group PG-B', 'neighbor 10.2.0.1 description XXX')
+
+    def test_remove_route_map(self):
+        delta = frr_delta.compute_delta(render([]), render([], route_maps=''))
+        self.assertEqual(delta.commands, ['no route-map RMP-PG-A-IMPORT permit 10', 'no ip prefix-list PXL-PG-A-0-IMPORT seq 10 permit 0.0.0.0/0'])
+
+    def test_change_route_map(self):
+        new = render([], route_maps=ROUTE_MAPS.replace('exit', '  set local-preference 200\nexit'))
+        delta = frr_delta.compute_delta(render([]), new)
+        self.assertEqual(delta.commands, ['route-map RMP-PG-A-IMPORT permit 10', 'set local-preference 200', 'exit'])
+
+    def test_frr_defaults_requires_restart(self):
+        delta = frr_delta.compute_delta(render([]), render([], header=HEADER.replace('datacenter', 'traditional')))
+        self.assertTrue(delta.requires_restart)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+from health import count_established_sessions, wait_for_convergence
+
+
+class FakeClock:
+    """
+    Clock advanced only by sleep and by probes taking probe_time seconds each.
+    """
+
+    def __init__(self, probe_time=0.0):
+        self.now = 0.0
+        self.probe_time = probe_time
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    def probe(self, values):
+        values = iter(values)
+        last = []
+
+        def get():
+            self.now += self.probe_time
+            last[:] = [next(values, last[0] if last else None)]
+            return last[0]
+        return get
+
+
+def wait(clock, bgp_sessions, system_health, bgp_values, health_values, deadline=90, interval=5):
+    return wait_for_convergence(
+        bgp_sessions, system_health, clock.probe(bgp_values), clock.probe(health_values),
+        deadline=deadline, interval=interval, clock=clock, sleep=clock.sleep, log=lambda line: None
+    )
+
+
+class HealthTest(unittest.TestCase):
+
+    def test_count_established_sessions(self):
+        data = {
+            'default': {'ipv4Unicast': {'peers': {'10.0.0.1': {'state': 'Established'}, '10.0.0.2': {'state': 'Active'}}}},
+            'Vrf2': {'ipv4Unicast': {'peers': {'Ethernet0.10': {'state': 'Established'}}}},
+        }
+        self.assertEqual(count_established_sessions(data), 2)
+
+    def test_converged_immediately(self):
+        clock = FakeClock()
+        result = wait(clock, 4, True, [4], [True])
+        self.assertTrue(result.converged)
+        self.assertFalse(result.revert)
+        self.assertEqual(len(result.samples), 1)
+        self.assertEqual(result.elapsed, 5)
+
+    def test_converges_after_sessions_come_back(self):
+        clock = FakeClock()
+        result = wait(clock, 4, True, [0, 2, 4], [False, True, True])
+        self.assertTrue(result.converged)
+        self.assertEqual([sample.bgp_sessions for sample in result.samples], [0, 2, 4])
+        self.assertEqual(result.elapsed, 15)
+
+    def test_timeout_reverts_when_sessions_dropped(self):
+        clock = FakeClock()
+        result = wait(clock, 10, True, [0], [True], deadline=30)
+        self.assertFalse(result.converged)
+        self.assertTrue(result.revert)
+        self.assertEqual(result.reasons, ['Number of BGP sessions dropped'])
+        # The last sample is taken at the deadline, no poll goes past it
+        self.assertEqual(result.elapsed, 30)
+        self.assertEqual(len(result.samples), 6)
+
+    def test_timeout_reverts_when_health_turned_negative(self):
+        result = wait(FakeClock(), 4, True, [4], [False], deadline=20)
+        self.assertFalse(result.converged)
+        self.assertEqual(result.reasons, ['System health changed to negative'])
+
+    def test_timeout_without_revert(self):
+        # One session less is not enough to revert
+        result = wait(FakeClock(), 4, True, [3], [True], deadline=20)
+        self.assertFalse(result.converged)
+        self.assertFalse(result.revert)
+
+    def test_checks_interval(self):
+        clock = FakeClock()
+        result = wait(clock, 4, True, [0], [True], deadline=10, interval=2)
+        self.assertEqual(clock.sleeps, [2] * 5)
+        self.assertEqual([sample.elapsed for sample in result.samples], [2, 4, 6, 8, 10])
+
+    def test_probe_durations(self):
+        clock = FakeClock(probe_time=0.5)
+        result = wait(clock, 4, True, [4], [True])
+        self.assertEqual(result.samples[0].bgp_duration, 0.5)
+        self.assertEqual(result.samples[0].health_duration, 0.5)
+        self.assertEqual(result.elapsed, 6)
+
+
+if __name__ == '__main__':
+    unittest.main()